@@ -1,10 +1,10 @@
 # src/alias_sync.py
 import os
-from mlflow import MlflowClient
+from registry_trace import traced_client
 
 def main():
     name = os.environ.get("MODEL_NAME", "w7d1_cancer_classifier")
-    c = MlflowClient()
+    c = traced_client()
 
     # Pick current Production and Staging by stage
     mvs = list(c.search_model_versions(f"name='{name}'"))
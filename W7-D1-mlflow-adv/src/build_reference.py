@@ -1,11 +1,10 @@
 import os, json, numpy as np
-from sklearn.datasets import load_breast_cancer
+from dataset_cache import load_dataset
 
 os.makedirs("outputs", exist_ok=True)
-data = load_breast_cancer()
-X = data.data  # (n, 30)
+X, _, data_fp = load_dataset()  # (n, 30), memory-mapped from the shared cache
 
-ref = {"n_features": X.shape[1], "bins": 10, "features": []}
+ref = {"n_features": X.shape[1], "bins": 10, "data_fingerprint": data_fp, "features": []}
 for c in range(X.shape[1]):
     col = X[:, c]
     edges = np.quantile(col, np.linspace(0, 1, 11))  # 10 bins → 11 edges
@@ -19,5 +18,5 @@ for c in range(X.shape[1]):
 
 with open("outputs/reference_bins.json", "w") as f:
     json.dump(ref, f, indent=2)
-print("[OK] wrote outputs/reference_bins.json")
+print(f"[OK] wrote outputs/reference_bins.json (data={data_fp})")
 
@@ -1,6 +1,6 @@
 import os, argparse, yaml, sys
 import mlflow
-from mlflow.tracking import MlflowClient
+from registry_trace import traced_client
 
 def load_yaml(path):
     with open(path, "r") as f: return yaml.safe_load(f)
@@ -13,7 +13,7 @@ def latest_by_stage(client, name, stage):
 def main(stage: str):
     os.environ.setdefault("MLFLOW_TRACKING_URI", os.getenv("MLFLOW_TRACKING_URI","http://54.147.138.39:8081"))
     mlflow.set_tracking_uri(os.environ["MLFLOW_TRACKING_URI"])
-    client = MlflowClient()
+    client = traced_client()
 
     params = load_yaml("params.yaml")
     policy = load_yaml("governance.tags.yaml")
@@ -1,31 +1,218 @@
-import os, argparse, sys, yaml
+import os, argparse, sys, json, hashlib, yaml
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import mlflow
 from mlflow import MlflowClient
+from dataset_cache import fingerprint, holdout_indices, holdout_spec, load_dataset
+from perf_record import DEFAULT_TRACKING_URI, SAMPLES_METRIC, SERVING_METRICS, serving_metrics
+from registry_trace import traced_client
+
+CACHE_DIR = ".cache"
+EVAL_REPORT = "outputs/gate_report.json"
 
 def load_yaml(path: str):
     with open(path, "r") as f:
         return yaml.safe_load(f)
 
-def get_metric_from_run(client: MlflowClient, run_id: str, metric_key: str):
+def get_run_data(client: MlflowClient, run_id: str):
+    # One get_run per version; the quality, latency and tag checks all read from it
     if not run_id:
         return None
-    run = client.get_run(run_id)
-    return run.data.metrics.get(metric_key)
+    return client.get_run(run_id).data
 
 def stage_to_alias(stage: str) -> str:
     mapping = {"Production": "production", "Staging": "staging"}
     return mapping.get(stage, stage.lower())
 
-def main(candidate_version: int):
+# ---------- Evaluation gate (shared dataset, paired bootstrap) ----------
+
+def load_eval_set(params: dict):
+    """The reserved eval holdout (params.yaml eval_holdout), which train.py keeps out of every split."""
+    holdout = holdout_spec(params)
+    if holdout is None:
+        raise SystemExit("[GATE] --mode eval needs eval_holdout in params.yaml")
+    X, y, data_fp = load_dataset()
+    ho = holdout_indices(y, data_fp, *holdout)
+    X_eval, y_eval = X[ho], np.asarray(y[ho])
+    return X_eval, y_eval, fingerprint(X_eval, y_eval), data_fp, f"f{holdout[0]}_s{holdout[1]}"
+
+def cached_scores(model_name: str, mv, X: np.ndarray, fp: str) -> np.ndarray:
+    """P(y=1) for a registered version; keyed on (version, run, dataset fingerprint)."""
+    # Version numbers alone repeat across registries (EC2, local, throwaway SQLite) and after a
+    # model is deleted and re-registered; the run id (or source URI) pins the actual artifact
+    version = mv.version
+    origin = mv.run_id or hashlib.sha1(str(mv.source).encode()).hexdigest()[:16]
+    path = os.path.join(CACHE_DIR, "predictions", f"{model_name}_v{version}_{origin}_{fp}.npy")
+    if os.path.exists(path):
+        print(f"[GATE] v{version}: cached predictions ({path})")
+        return np.load(path)
+
+    import mlflow.sklearn
+    model = mlflow.sklearn.load_model(f"models:/{model_name}/{version}")
+    if hasattr(model, "predict_proba"):
+        scores = model.predict_proba(X)[:, 1]
+    else:
+        scores = model.predict(X)
+    scores = np.asarray(scores, dtype=np.float64)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.save(path, scores)
+    print(f"[GATE] v{version}: scored {len(scores)} rows")
+    return scores
+
+def bootstrap_weights(n: int, resamples: int, seed: int) -> np.ndarray:
+    # (B, n) counts of each row per resample; identical for both models => paired
+    rng = np.random.default_rng(seed)
+    w = rng.multinomial(n, np.full(n, 1.0 / n), size=resamples).astype(np.float64)
+    # row 0 is the full sample, i.e. the point estimate
+    return np.vstack([np.ones((1, n)), w])
+
+def weighted_auc(scores: np.ndarray, y: np.ndarray, w: np.ndarray) -> np.ndarray:
+    """ROC AUC for every row of weights at once (ties count 1/2)."""
+    uniq, group = np.unique(scores, return_inverse=True)
+    B, G = len(w), len(uniq)
+    # (B, G) positive/negative mass per score value: one bincount over (resample, group) keys,
+    # O(B*n) time and memory instead of a dense n x G one-hot
+    key = (np.arange(B)[:, None] * G + group[None, :]).ravel()
+    pos = np.bincount(key, weights=(w * (y == 1)).ravel(), minlength=B * G).reshape(B, G)
+    neg = np.bincount(key, weights=(w * (y == 0)).ravel(), minlength=B * G).reshape(B, G)
+    neg_below = np.cumsum(neg, axis=1) - neg
+    num = np.sum(pos * (neg_below + 0.5 * neg), axis=1)
+    den = pos.sum(axis=1) * neg.sum(axis=1)
+    return np.divide(num, den, out=np.full(len(w), np.nan), where=den > 0)
+
+def weighted_accuracy(pred: np.ndarray, y: np.ndarray, w: np.ndarray) -> np.ndarray:
+    return (w @ (pred == y).astype(np.float64)) / w.sum(axis=1)
+
+def weighted_f1(pred: np.ndarray, y: np.ndarray, w: np.ndarray) -> np.ndarray:
+    tp = w @ ((pred == 1) & (y == 1)).astype(np.float64)
+    fp = w @ ((pred == 1) & (y == 0)).astype(np.float64)
+    fn = w @ ((pred == 0) & (y == 1)).astype(np.float64)
+    den = 2 * tp + fp + fn
+    return np.divide(2 * tp, den, out=np.zeros_like(tp), where=den > 0)
+
+def metric_samples(metric: str, scores: np.ndarray, y: np.ndarray, w: np.ndarray) -> np.ndarray:
+    if metric == "auc":
+        return weighted_auc(scores, y, w)
+    pred = (scores >= 0.5).astype(np.int64)
+    if metric == "accuracy":
+        return weighted_accuracy(pred, y, w)
+    if metric == "f1":
+        return weighted_f1(pred, y, w)
+    raise ValueError(f"Unsupported metric for eval gate: {metric}")
+
+def paired_bootstrap(metric: str, cand: np.ndarray, prod: np.ndarray, y: np.ndarray,
+                     resamples: int, confidence: float, seed: int) -> dict:
+    w = bootstrap_weights(len(y), resamples, seed)
+    c, p = metric_samples(metric, cand, y, w), metric_samples(metric, prod, y, w)
+    delta = c - p
+    alpha = (1.0 - confidence) / 2.0
+    lo, hi = np.nanquantile(delta[1:], [alpha, 1.0 - alpha])
+    return {
+        "metric": metric,
+        "candidate": float(c[0]),
+        "production": float(p[0]),
+        "delta": float(delta[0]),
+        "ci_low": float(lo),
+        "ci_high": float(hi),
+        "confidence": confidence,
+        "resamples": resamples,
+    }
+
+def eval_gate(model_name: str, cand, prod, cand_data, prod_data, policy: dict, params: dict) -> bool:
+    metric_key = policy["primary_metric"]
+    allowed_regression = float(policy["allowed_regression"])
+    cfg = policy.get("eval_gate", {}) or {}
+    resamples = int(cfg.get("bootstrap_resamples", 1000))
+    confidence = float(cfg.get("confidence", 0.95))
+    seed = int(cfg.get("seed", 0))
+
+    X, y, fp, data_fp, holdout = load_eval_set(params)
+    candidate_version = int(cand.version)
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        cand_scores, prod_scores = ex.map(lambda mv: cached_scores(model_name, mv, X, fp), (cand, prod))
+
+    # Training-data fingerprints and holdout tags (train.py) tell whether both saw the same data
+    # and whether either was fit on eval rows (trained before the holdout was reserved)
+    train_fps, holdouts = {}, {}
+    for role, data in (("candidate", cand_data), ("production", prod_data)):
+        tags = data.tags if data is not None else {}
+        train_fps[role], holdouts[role] = tags.get("data.fingerprint"), tags.get("data.holdout")
+    if len(set(train_fps.values())) != 1 or None in train_fps.values():
+        print(f"[GATE] WARN: training data differs or is untracked: {train_fps}")
+    if any(h != holdout for h in holdouts.values()):
+        print(f"[GATE] WARN: not trained with eval holdout {holdout}, scores may be in-sample: {holdouts}")
+
+    res = paired_bootstrap(metric_key, cand_scores, prod_scores, y, resamples, confidence, seed)
+    passed = res["ci_low"] >= -allowed_regression
+    print(f"[GATE] eval set fp={fp} n={len(y)} | {metric_key}: candidate v{candidate_version}="
+          f"{res['candidate']:.6f} production v{prod.version}={res['production']:.6f} | "
+          f"Δ={res['delta']:.6f} {int(confidence * 100)}% CI [{res['ci_low']:.6f}, {res['ci_high']:.6f}]")
+
+    report = {"mode": "eval", "model": model_name, "candidate_version": int(candidate_version),
+              "production_version": int(prod.version), "eval_fingerprint": fp, "dataset_fingerprint": data_fp,
+              "training_fingerprints": train_fps, "holdout": holdout, "training_holdouts": holdouts,
+              "n": int(len(y)),
+              "allowed_regression": allowed_regression, "passed": bool(passed), **res}
+    os.makedirs("outputs", exist_ok=True)
+    with open(EVAL_REPORT, "w") as f:
+        json.dump(report, f, indent=2)
+    return passed
+
+# ---------- Serving SLO gate (metrics recorded by smoke_test/load_test) ----------
+
+def latency_gate(cand, prod, cand_data, prod_data, policy: dict) -> bool:
+    cfg = policy.get("latency_gate", {}) or {}
+    if not cfg.get("enabled", True):
+        return True
+    tolerance = float(cfg.get("tolerance", 0.10))
+    # Tail percentiles from a short smoke run are mostly noise: wider bands, and no
+    # comparison at all unless both sides were measured on enough requests
+    tolerances = {k: float(v) for k, v in (cfg.get("percentile_tolerance") or {}).items()}
+    min_samples = int(cfg.get("min_samples", 0))
+    cm = serving_metrics(cand_data)
+    if not cm:
+        print(f"[GATE] latency: v{cand.version} has no serve.* metrics "
+              f"(smoke_test.py/load_test.py --record-version {cand.version})")
+        return not cfg.get("require_metrics", False)
+
+    ok = True
+    slo = (cand.tags or {}).get("serve.slo.p95_ms") or policy.get("latency_p95_budget_ms")
+    if slo is not None and "serve.p95_ms" in cm:
+        within = cm["serve.p95_ms"] <= float(slo)
+        ok &= within
+        print(f"[GATE] latency: v{cand.version} serve.p95_ms={cm['serve.p95_ms']:.2f} vs SLO {float(slo):.0f}ms "
+              f"{'OK' if within else 'BREACH'}")
+
+    pm = serving_metrics(prod_data) if prod else {}
+    for key, direction in SERVING_METRICS.items():
+        if key not in cm or key not in pm:
+            continue
+        tol = tolerances.get(key, tolerance)
+        if key in tolerances:
+            n = min(cm.get(SAMPLES_METRIC, 0), pm.get(SAMPLES_METRIC, 0))
+            if n < min_samples:
+                print(f"[GATE] latency: {key} skipped, {int(n)} samples < min_samples {min_samples} "
+                      f"(candidate={cm[key]:.3f} production v{prod.version}={pm[key]:.3f})")
+                continue
+        if direction == "lower":
+            worse = cm[key] > pm[key] * (1.0 + tol)
+        else:
+            worse = cm[key] < pm[key] * (1.0 - tol)
+        ok &= not worse
+        print(f"[GATE] latency: {key} candidate={cm[key]:.3f} production v{prod.version}={pm[key]:.3f} "
+              f"(tol {tol:.0%}) {'REGRESSION' if worse else 'OK'}")
+    return bool(ok)
+
+def main(candidate_version: int, mode: str):
     # URIs
-    tracking_uri = os.getenv("MLFLOW_TRACKING_URI", "http://127.0.0.1:5001")
+    tracking_uri = os.getenv("MLFLOW_TRACKING_URI", DEFAULT_TRACKING_URI)
     registry_uri = os.getenv("MLFLOW_REGISTRY_URI", tracking_uri)
     os.environ.setdefault("MLFLOW_TRACKING_URI", tracking_uri)
     os.environ.setdefault("MLFLOW_REGISTRY_URI", registry_uri)
     mlflow.set_tracking_uri(tracking_uri)
     mlflow.set_registry_uri(registry_uri)
 
-    client = MlflowClient()
+    client = traced_client()
     policy = load_yaml("policy.yaml")
     params = load_yaml("params.yaml")
 
@@ -36,45 +223,54 @@ def main(candidate_version: int):
 
     # Candidate
     cand = client.get_model_version(name=model_name, version=str(candidate_version))
-    cand_metric = get_metric_from_run(client, cand.run_id, metric_key)
+    cand_data = get_run_data(client, cand.run_id)
+    cand_metric = cand_data.metrics.get(metric_key) if cand_data else None
 
-    # Current "production" via alias (no stages)
-    prod_alias = stage_to_alias("Staging")
+    # Current production via alias (no stages)
+    prod_alias = stage_to_alias("Production")
     try:
         prod = client.get_model_version_by_alias(model_name, prod_alias)
     except Exception:
         prod = None
+    prod_data = get_run_data(client, prod.run_id) if prod else None
 
     if not prod:
-        if allow_first:
-            print(f"[GATE] No current alias '{prod_alias}'. Allowing first promotion. "
-                  f"Candidate v{candidate_version} {metric_key}={cand_metric}.")
-            sys.exit(0)
-        else:
+        if not allow_first:
             print(f"[GATE] No version bound to alias '{prod_alias}' and first promotion not allowed.")
             sys.exit(1)
+        print(f"[GATE] No current alias '{prod_alias}'. Allowing first promotion. "
+              f"Candidate v{candidate_version} {metric_key}={cand_metric}.")
+        quality_ok, why = True, ""
+    elif mode == "eval":
+        # Decide on the CI lower bound of the paired delta, not the point estimate
+        quality_ok = eval_gate(model_name, cand, prod, cand_data, prod_data, policy, params)
+        why = "CI lower bound exceeds allowed regression"
+    else:
+        prod_metric = prod_data.metrics.get(metric_key) if prod_data else None
 
-    prod_metric = get_metric_from_run(client, prod.run_id, metric_key)
+        if cand_metric is None or prod_metric is None:
+            print(f"[GATE] Missing metric '{metric_key}' on candidate or production. "
+                  f"Candidate={cand_metric}, Production={prod_metric}")
+            sys.exit(1)
 
-    if cand_metric is None or prod_metric is None:
-        print(f"[GATE] Missing metric '{metric_key}' on candidate or production. "
-              f"Candidate={cand_metric}, Production={prod_metric}")
-        sys.exit(1)
+        delta = float(cand_metric) - float(prod_metric)
+        print(f"[GATE] Candidate v{candidate_version} {metric_key}={cand_metric:.6f} | "
+              f"Current '{prod_alias}' v{prod.version} {metric_key}={prod_metric:.6f} | Δ={delta:.6f}")
+        quality_ok, why = delta >= -allowed_regression, "exceeds allowed regression"
 
-    delta = float(cand_metric) - float(prod_metric)
-    print(f"[GATE] Candidate v{candidate_version} {metric_key}={cand_metric:.6f} | "
-          f"Current '{prod_alias}' v{prod.version} {metric_key}={prod_metric:.6f} | Δ={delta:.6f}")
+    # A better-scoring but slower model must not slip through
+    latency_ok = latency_gate(cand, prod, cand_data, prod_data, policy)
 
-    if delta >= -allowed_regression:
+    if quality_ok and latency_ok:
         print("[GATE] PASS")
         sys.exit(0)
-    else:
-        print("[GATE] FAIL (exceeds allowed regression)")
-        sys.exit(1)
+    print(f"[GATE] FAIL ({why if not quality_ok else 'serving latency/throughput regression'})")
+    sys.exit(1)
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("--candidate-version", type=int, required=True)
+    ap.add_argument("--mode", choices=["metric", "eval"], default="metric",
+                    help="metric: compare logged run metrics; eval: score both versions on a shared eval set")
     args = ap.parse_args()
-    main(args.candidate_version)
-
+    main(args.candidate_version, args.mode)
@@ -0,0 +1,121 @@
+import os, json, hashlib, time
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+CACHE_ROOT = os.path.join(".cache", "datasets")
+DEFAULT_DATASET = "breast_cancer"
+
+def fingerprint(*arrays: np.ndarray) -> str:
+    """Content hash over dtype, shape and bytes of each array."""
+    h = hashlib.sha256()
+    for a in arrays:
+        a = np.ascontiguousarray(a)
+        h.update(f"{a.dtype.str}{a.shape}".encode())
+        h.update(a.tobytes())
+    return h.hexdigest()[:16]
+
+def file_fingerprint(path: str, block: int = 1 << 20) -> str:
+    """Content hash of a file, read in blocks so it never has to fit in memory."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for b in iter(lambda: f.read(block), b""):
+            h.update(b)
+    return h.hexdigest()[:16]
+
+def _fetch(name: str):
+    if name == "breast_cancer":
+        from sklearn.datasets import load_breast_cancer
+        data = load_breast_cancer()
+        return data.data, data.target
+    raise ValueError(f"Unknown dataset: {name}")
+
+def _dir(name: str, fp: str) -> str:
+    return os.path.join(CACHE_ROOT, name, fp)
+
+def _write_atomic(path: str, arr: np.ndarray):
+    tmp = f"{path}.{os.getpid()}.tmp.npy"
+    np.save(tmp, arr)
+    os.replace(tmp, path)
+
+def materialize(name: str = DEFAULT_DATASET) -> str:
+    """Fetch the source dataset, write X/y as .npy under its fingerprint; returns the fingerprint."""
+    X, y = _fetch(name)
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.int64)
+    fp = fingerprint(X, y)
+    d = _dir(name, fp)
+    if not os.path.exists(os.path.join(d, "meta.json")):
+        os.makedirs(os.path.join(d, "splits"), exist_ok=True)
+        _write_atomic(os.path.join(d, "X.npy"), X)
+        _write_atomic(os.path.join(d, "y.npy"), y)
+        meta = {"name": name, "fingerprint": fp, "n_rows": int(X.shape[0]),
+                "n_features": int(X.shape[1]), "created": time.time()}
+        with open(os.path.join(d, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+    with open(os.path.join(CACHE_ROOT, name, "CURRENT"), "w") as f:
+        f.write(fp)
+    return fp
+
+def current_fingerprint(name: str = DEFAULT_DATASET):
+    p = os.path.join(CACHE_ROOT, name, "CURRENT")
+    if not os.path.exists(p):
+        return None
+    with open(p) as f:
+        fp = f.read().strip()
+    return fp if os.path.exists(os.path.join(_dir(name, fp), "meta.json")) else None
+
+def load_dataset(name: str = DEFAULT_DATASET, fp: str = None, refresh: bool = False):
+    """(X, y, fingerprint) as read-only memmaps; processes opening the same files share pages."""
+    if refresh or fp is None:
+        fp = (None if refresh else current_fingerprint(name)) or materialize(name)
+    d = _dir(name, fp)
+    X = np.load(os.path.join(d, "X.npy"), mmap_mode="r")
+    y = np.load(os.path.join(d, "y.npy"), mmap_mode="r")
+    return X, y, fp
+
+def holdout_spec(params: dict):
+    """(fraction, seed) of the reserved eval holdout from params.yaml, or None if not configured."""
+    h = params.get("eval_holdout")
+    return (float(h["fraction"]), int(h["seed"])) if h else None
+
+def holdout_indices(y: np.ndarray, fp: str, fraction: float, seed: int, name: str = DEFAULT_DATASET):
+    """Fixed stratified eval holdout: every training split excludes these rows, every gate scores on them."""
+    path = os.path.join(_dir(name, fp), "splits", f"holdout_f{fraction}_s{seed}.npy")
+    if os.path.exists(path):
+        return np.load(path, mmap_mode="r")
+    _, ho = train_test_split(np.arange(len(y)), test_size=fraction, random_state=seed,
+                             stratify=np.asarray(y))
+    ho = np.sort(ho)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _write_atomic(path, ho)
+    return ho
+
+def split_indices(y: np.ndarray, fp: str, seed: int, test_size: float, name: str = DEFAULT_DATASET,
+                  holdout=None):
+    """Stratified train/test row indices for (fingerprint, seed, test_size), computed once and cached.
+
+    holdout=(fraction, seed) draws both parts from the rows outside the reserved eval holdout.
+    """
+    suffix = f"_ho{holdout[0]}s{holdout[1]}" if holdout else ""
+    base = os.path.join(_dir(name, fp), "splits", f"seed{seed}_ts{test_size}{suffix}")
+    tr_p, te_p = f"{base}.train.npy", f"{base}.test.npy"
+    if os.path.exists(tr_p) and os.path.exists(te_p):
+        return np.load(tr_p, mmap_mode="r"), np.load(te_p, mmap_mode="r")
+    pool = np.arange(len(y))
+    if holdout:
+        pool = np.setdiff1d(pool, holdout_indices(y, fp, *holdout, name=name))
+    tr, te = train_test_split(pool, test_size=test_size, random_state=seed,
+                              stratify=np.asarray(y)[pool])
+    os.makedirs(os.path.dirname(base), exist_ok=True)
+    _write_atomic(tr_p, tr)
+    _write_atomic(te_p, te)
+    return tr, te
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--name", default=DEFAULT_DATASET)
+    ap.add_argument("--refresh", action="store_true", help="Re-fetch the source and re-fingerprint")
+    args = ap.parse_args()
+    X, y, fp = load_dataset(args.name, refresh=args.refresh)
+    print(f"[DATA] {args.name} fingerprint={fp} X={X.shape} y={y.shape} at {_dir(args.name, fp)}")
@@ -39,7 +39,8 @@ def main():
     X = read_recent_rows()
     if X.size == 0:
         print("[DRIFT] No recent requests to evaluate.")
-        report = {"status": "no_data", "avg_psi": None, "features": []}
+        report = {"status": "no_data", "avg_psi": None, "reference_fingerprint": ref.get("data_fingerprint"),
+                  "features": []}
         os.makedirs("outputs", exist_ok=True)
         with open(OUT, "w") as f: json.dump(report, f, indent=2)
         return
@@ -70,7 +71,8 @@ def main():
         status, severity = "drift", "moderate"
 
     report = {"status": status, "severity": severity, "avg_psi": round(avg_psi, 4),
-              "max_psi": round(float(np.max(psis)), 4), "features": feat_reports}
+              "max_psi": round(float(np.max(psis)), 4), "reference_fingerprint": ref.get("data_fingerprint"),
+              "features": feat_reports}
     os.makedirs("outputs", exist_ok=True)
     with open(OUT, "w") as f: json.dump(report, f, indent=2)
     print("[DRIFT]", json.dumps(report))
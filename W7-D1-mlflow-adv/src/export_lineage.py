@@ -1,6 +1,6 @@
 import os, json, yaml
 import mlflow
-from mlflow.tracking import MlflowClient
+from registry_trace import traced_client
 
 def load_yaml(p):
     with open(p,"r") as f: 
@@ -9,7 +9,7 @@ def load_yaml(p):
 def main():
     os.environ.setdefault("MLFLOW_TRACKING_URI", os.getenv("MLFLOW_TRACKING_URI","http://54.147.138.39:8081"))
     mlflow.set_tracking_uri(os.environ["MLFLOW_TRACKING_URI"])
-    c = MlflowClient()
+    c = traced_client()
     name = load_yaml("params.yaml")["registered_model_name"]
     versions = sorted(c.search_model_versions(f"name='{name}'"), key=lambda v: int(v.version))
 
@@ -3,7 +3,8 @@ import mlflow
 
 os.environ.setdefault("MLFLOW_TRACKING_URI", os.getenv("MLFLOW_TRACKING_URI", "http://54.147.151.249:8081"))
 mlflow.set_tracking_uri(os.environ["MLFLOW_TRACKING_URI"])
-client = mlflow.MlflowClient()
+from registry_trace import traced_client
+client = traced_client()
 
 name = "w7d1_cancer_classifier"
 print(f"Registered Model: {name}")
@@ -0,0 +1,203 @@
+import argparse, asyncio, json, math, os, time
+import httpx
+import numpy as np
+
+REPORT = "outputs/bench_report.json"
+
+class LatencyHistogram:
+    """HDR-style log-bucketed histogram: fixed memory, ~1% relative error, exact max."""
+
+    def __init__(self, precision: float = 0.01, max_us: float = 120e6):
+        self.base = math.log1p(precision)
+        self.counts = np.zeros(int(math.log(max_us) / self.base) + 2, dtype=np.int64)
+        self.total = 0
+        self.max_us = 0.0
+
+    def record(self, us: float):
+        us = max(us, 1.0)
+        self.counts[min(int(math.log(us) / self.base), len(self.counts) - 1)] += 1
+        self.total += 1
+        self.max_us = max(self.max_us, us)
+
+    def merge(self, other: "LatencyHistogram"):
+        self.counts += other.counts
+        self.total += other.total
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile_ms(self, q: float) -> float:
+        if self.total == 0:
+            return float("nan")
+        rank = max(1, math.ceil(q / 100.0 * self.total))
+        idx = int(np.searchsorted(np.cumsum(self.counts), rank))
+        # upper edge of the bucket, capped by the exact max
+        return min(math.exp((idx + 1) * self.base), self.max_us) / 1000.0
+
+    def summary(self) -> dict:
+        return {
+            "p50_ms": round(self.percentile_ms(50), 3),
+            "p90_ms": round(self.percentile_ms(90), 3),
+            "p95_ms": round(self.percentile_ms(95), 3),
+            "p99_ms": round(self.percentile_ms(99), 3),
+            "p999_ms": round(self.percentile_ms(99.9), 3),
+            "max_ms": round(self.max_us / 1000.0, 3),
+        }
+
+def make_payload(n_features: int, batch: int, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    return json.dumps({"rows": rng.normal(size=(batch, n_features)).round(4).tolist()}).encode()
+
+async def open_loop(client: httpx.AsyncClient, url: str, body: bytes, rate: float, n: int,
+                    timeout_s: float = 10.0) -> dict:
+    """Send n requests on a fixed schedule (rate/s) regardless of responses.
+
+    Latency is measured from the *intended* send time, so a stalled server or a lagging
+    generator shows up in the tail instead of being hidden (coordinated omission).
+    """
+    hist = LatencyHistogram()
+    codes = {}
+    headers = {"content-type": "application/json"}
+
+    async def fire(intended: float):
+        try:
+            r = await client.post(url, content=body, headers=headers, timeout=timeout_s)
+            code = r.status_code
+        except httpx.HTTPError:
+            code = 0
+        hist.record((time.perf_counter() - intended) * 1e6)
+        codes[code] = codes.get(code, 0) + 1
+
+    tasks = []
+    t0 = time.perf_counter() + 0.05
+    for i in range(n):
+        intended = t0 + i / rate
+        delay = intended - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(fire(intended)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - t0
+
+    ok = codes.get(200, 0)
+    return {"hist": hist, "ok": ok, "errors": n - ok, "codes": {str(k): v for k, v in codes.items()},
+            "elapsed_s": elapsed, "achieved_rps": ok / elapsed if elapsed > 0 else 0.0}
+
+async def wait_ready(client: httpx.AsyncClient, base_url: str, timeout_s: float, tag: str = "BENCH") -> bool:
+    """Poll /readyz until 200; the server binds its port before the model is loaded and warmed up."""
+    deadline = time.monotonic() + timeout_s
+    while True:
+        try:
+            r = await client.get(f"{base_url}/readyz")
+            if r.status_code == 200 or r.status_code == 404:  # 404: server without /readyz
+                return True
+            try:
+                phase = r.json().get("phase")
+            except (ValueError, AttributeError):  # proxy error pages, non-object bodies
+                phase = None
+            if phase == "failed":
+                print(f"[{tag}] server failed to boot: {r.text}")
+                return False
+        except httpx.HTTPError:
+            pass
+        if time.monotonic() > deadline:
+            print(f"[{tag}] not ready after {timeout_s}s")
+            return False
+        await asyncio.sleep(0.5)
+
+async def fetch_n_features(client: httpx.AsyncClient, base_url: str, default: int = 30) -> int:
+    h = await client.get(f"{base_url}/healthz")
+    h.raise_for_status()
+    return int(h.json().get("n_features") or default)
+
+async def sweep(base_url: str, rates: list, batches: list, duration_s: float, slo_p99_ms: float,
+                max_error_rate: float, connections: int, ready_timeout_s: float = 60.0) -> dict:
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    results, ceiling = [], {}
+    async with httpx.AsyncClient(limits=limits) as client:
+        # /healthz reports n_features=None until the model is loaded
+        if not await wait_ready(client, base_url, ready_timeout_s):
+            raise SystemExit(1)
+        n_features = await fetch_n_features(client, base_url)
+        for batch in batches:
+            body = make_payload(n_features, batch)
+            ceiling[str(batch)] = None
+            for rate in sorted(rates):
+                n = max(1, int(rate * duration_s))
+                res = await open_loop(client, f"{base_url}/predict", body, rate, n)
+                row = {"batch": batch, "rate": rate, "requests": n, "ok": res["ok"], "errors": res["errors"],
+                       "codes": res["codes"], "achieved_rps": round(res["achieved_rps"], 2),
+                       "rows_per_s": round(res["achieved_rps"] * batch, 1), **res["hist"].summary()}
+                err_rate = res["errors"] / n
+                row["sustained"] = (row["p99_ms"] <= slo_p99_ms and err_rate <= max_error_rate
+                                    and res["achieved_rps"] >= 0.95 * rate)
+                results.append(row)
+                print(f"[BENCH] batch={batch} rate={rate}/s achieved={row['achieved_rps']}/s "
+                      f"p50={row['p50_ms']} p99={row['p99_ms']} p99.9={row['p999_ms']} max={row['max_ms']} "
+                      f"err={err_rate:.2%} {'OK' if row['sustained'] else 'SATURATED'}")
+                if not row["sustained"]:
+                    break  # past the knee; higher rates only queue up
+                ceiling[str(batch)] = rate
+    return {"base_url": base_url, "ts": time.time(), "n_features": n_features, "duration_s": duration_s,
+            "slo_p99_ms": slo_p99_ms, "max_error_rate": max_error_rate, "results": results,
+            "ceiling_rps": ceiling}
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions vs a stored report: lower ceiling, or p99 worse by more than tolerance at a shared step."""
+    problems = []
+    for batch, base_ceiling in (baseline.get("ceiling_rps") or {}).items():
+        cur = (report.get("ceiling_rps") or {}).get(batch)
+        if base_ceiling and (cur is None or cur < base_ceiling):
+            problems.append(f"batch={batch}: ceiling {cur} < baseline {base_ceiling} rps")
+    base_rows = {(r["batch"], r["rate"]): r for r in baseline.get("results", [])}
+    for r in report.get("results", []):
+        b = base_rows.get((r["batch"], r["rate"]))
+        if b and b.get("sustained") and r["p99_ms"] > b["p99_ms"] * (1.0 + tolerance):
+            problems.append(f"batch={r['batch']} rate={r['rate']}: p99 {r['p99_ms']}ms > "
+                            f"baseline {b['p99_ms']}ms +{tolerance:.0%}")
+    return problems
+
+def parse_list(s: str, cast):
+    return [cast(v) for v in s.split(",") if v.strip()]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base-url", default="http://127.0.0.1:8085")
+    ap.add_argument("--rates", default="10,25,50,100,200,400", help="Offered request rates (req/s)")
+    ap.add_argument("--batches", default="1,16,128", help="Rows per request")
+    ap.add_argument("--duration", type=float, default=10.0, help="Seconds per (rate, batch) step")
+    ap.add_argument("--slo-p99-ms", type=float, default=200.0)
+    ap.add_argument("--max-error-rate", type=float, default=0.01)
+    ap.add_argument("--connections", type=int, default=256)
+    ap.add_argument("--ready-timeout", type=float, default=60.0, help="seconds to wait for /readyz")
+    ap.add_argument("--out", default=REPORT)
+    ap.add_argument("--baseline", default="", help="Report to compare against; exit 2 on regression")
+    ap.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative p99 increase")
+    ap.add_argument("--record-version", type=int, default=None,
+                    help="Log the throughput ceiling (smallest batch) on this model version")
+    args = ap.parse_args()
+
+    report = asyncio.run(sweep(args.base_url, parse_list(args.rates, float), parse_list(args.batches, int),
+                               args.duration, args.slo_p99_ms, args.max_error_rate, args.connections,
+                               args.ready_timeout))
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[BENCH] ceiling_rps={json.dumps(report['ceiling_rps'])} -> {args.out}")
+
+    if args.record_version:
+        from perf_record import record_serving_metrics
+        smallest = str(min(int(b) for b in report["ceiling_rps"]))
+        record_serving_metrics(args.record_version, {"serve.throughput_rps": report["ceiling_rps"][smallest]},
+                               source=f"load_test batch={smallest}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(report, json.load(f), args.tolerance)
+        if problems:
+            print("[BENCH] REGRESSION vs baseline:")
+            for p in problems:
+                print("  -", p)
+            raise SystemExit(2)
+        print("[BENCH] No regression vs baseline.")
+
+if __name__ == "__main__":
+    main()
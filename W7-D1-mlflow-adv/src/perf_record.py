@@ -0,0 +1,42 @@
+import os, time, yaml
+import mlflow
+from mlflow.entities import Metric
+from registry_trace import traced_client
+
+# Same default as compare_and_gate.py, so the recorder writes where the gate reads
+DEFAULT_TRACKING_URI = "http://127.0.0.1:5001"
+
+# Serving metrics live on the version's source run so the gate can read them next to auc/f1.
+# Direction: which way is better when comparing candidate vs production.
+SERVING_METRICS = {
+    "serve.p95_ms": "lower",
+    "serve.p99_ms": "lower",
+    "serve.throughput_rps": "higher",
+    "serve.load_s": "lower",
+}
+# Requests behind the recorded percentiles; the gate ignores p95/p99 deltas from small runs
+SAMPLES_METRIC = "serve.samples"
+
+def load_yaml(path: str):
+    with open(path, "r") as f:
+        return yaml.safe_load(f)
+
+def record_serving_metrics(version: int, metrics: dict, source: str):
+    tracking_uri = os.getenv("MLFLOW_TRACKING_URI", DEFAULT_TRACKING_URI)
+    mlflow.set_tracking_uri(tracking_uri)
+    mlflow.set_registry_uri(os.getenv("MLFLOW_REGISTRY_URI", tracking_uri))
+    client = traced_client()
+    name = load_yaml("params.yaml")["registered_model_name"]
+    mv = client.get_model_version(name=name, version=str(version))
+    ts = int(time.time() * 1000)
+    vals = {k: float(v) for k, v in metrics.items() if v is not None}
+    client.log_batch(mv.run_id, metrics=[Metric(k, v, ts, 0) for k, v in vals.items()])
+    client.set_model_version_tag(name, mv.version, "serve.perf.source", source)
+    print(f"[PERF] Recorded on {name} v{mv.version} (run {mv.run_id}): {vals}")
+
+def serving_metrics(run_data) -> dict:
+    """serve.* metrics from an already fetched run's data (None when the version has no run)."""
+    if run_data is None:
+        return {}
+    m = run_data.metrics
+    return {k: m[k] for k in (*SERVING_METRICS, SAMPLES_METRIC) if k in m}
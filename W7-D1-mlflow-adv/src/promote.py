@@ -1,7 +1,7 @@
 import os, argparse, json, sys, subprocess, yaml
 from datetime import datetime, timezone
 import mlflow
-from mlflow import MlflowClient
+from registry_trace import traced_client
 
 AUDIT_PATH = "logs/audit.jsonl"
 
@@ -33,7 +33,7 @@ def main(candidate_version: int, stage: str, dry_run: bool, reason: str, promote
     mlflow.set_tracking_uri(tracking_uri)
     mlflow.set_registry_uri(registry_uri)
 
-    client = MlflowClient()
+    client = traced_client()
     model_name = load_yaml("params.yaml")["registered_model_name"]
 
     # Candidate version
@@ -65,8 +65,8 @@ def main(candidate_version: int, stage: str, dry_run: bool, reason: str, promote
     client.set_model_version_tag(name=model_name, version=mv.version, key="promote_reason", value=reason)
     if alias == "production":
         client.set_model_version_tag(name=model_name, version=mv.version, key="was_production", value="true")
-        if prev:
-            # Mark outgoing production
+        if prev and (prev.tags or {}).get("was_production") != "true":
+            # Mark outgoing production (normally already tagged when it was promoted)
             client.set_model_version_tag(name=model_name, version=prev.version, key="was_production", value="true")
 
     # Audit
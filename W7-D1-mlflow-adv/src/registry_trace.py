@@ -0,0 +1,165 @@
+import os, sys, json, time, atexit, shutil, subprocess, tempfile, yaml
+from mlflow import MlflowClient
+
+# REGISTRY_TRACE=summary prints a per-command table on exit; =json writes
+# $REGISTRY_TRACE_DIR/<command>.json. Unset = record nothing, zero overhead beyond a getattr.
+TRACE_MODE = os.getenv("REGISTRY_TRACE", "")
+TRACE_DIR = os.getenv("REGISTRY_TRACE_DIR", "outputs/registry_trace")
+
+def _size(obj) -> int:
+    """Approximate wire size: protobuf byte size for MLflow entities, JSON length otherwise."""
+    if obj is None:
+        return 0
+    if hasattr(obj, "to_proto"):
+        try:
+            return obj.to_proto().ByteSize()
+        except Exception:
+            pass
+    if isinstance(obj, (list, tuple)):
+        return sum(_size(o) for o in obj)
+    if isinstance(obj, dict):
+        return sum(_size(k) + _size(v) for k, v in obj.items())
+    return len(json.dumps(obj, default=str))
+
+class TracedClient:
+    """MlflowClient proxy that records method, latency and request/response size of every call."""
+
+    def __init__(self, client: MlflowClient, command: str):
+        self._client = client
+        self.command = command
+        self.calls = []
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+
+        def traced(*args, **kwargs):
+            t0 = time.perf_counter()
+            ok, out = True, None
+            try:
+                out = attr(*args, **kwargs)
+                return out
+            except Exception:
+                ok = False
+                raise
+            finally:
+                self.calls.append({"method": name, "ms": round((time.perf_counter() - t0) * 1000.0, 3),
+                                   "req_bytes": _size(list(args)) + _size(kwargs),
+                                   "resp_bytes": _size(out), "ok": ok})
+        return traced
+
+    def summary(self) -> dict:
+        by_method = {}
+        for c in self.calls:
+            m = by_method.setdefault(c["method"], {"calls": 0, "ms": 0.0, "req_bytes": 0, "resp_bytes": 0})
+            m["calls"] += 1
+            m["ms"] = round(m["ms"] + c["ms"], 3)
+            m["req_bytes"] += c["req_bytes"]
+            m["resp_bytes"] += c["resp_bytes"]
+        return {"command": self.command, "argv": sys.argv[1:], "total_calls": len(self.calls),
+                "total_ms": round(sum(c["ms"] for c in self.calls), 3),
+                "by_method": by_method, "calls": self.calls}
+
+    def report(self):
+        s = self.summary()
+        if TRACE_MODE == "json":
+            os.makedirs(TRACE_DIR, exist_ok=True)
+            with open(os.path.join(TRACE_DIR, f"{self.command}.json"), "w") as f:
+                json.dump(s, f, indent=2)
+            return
+        print(f"[TRACE] {self.command}: {s['total_calls']} registry calls, {s['total_ms']:.1f} ms", file=sys.stderr)
+        for method, m in sorted(s["by_method"].items(), key=lambda kv: -kv[1]["ms"]):
+            print(f"[TRACE]   {method:<36} x{m['calls']:<4} {m['ms']:>9.1f} ms "
+                  f"req={m['req_bytes']}B resp={m['resp_bytes']}B", file=sys.stderr)
+
+def traced_client(command: str = None):
+    """MlflowClient for CLI scripts; traced (and reported at exit) when REGISTRY_TRACE is set."""
+    client = MlflowClient()
+    if not TRACE_MODE:
+        return client
+    tc = TracedClient(client, command or os.path.splitext(os.path.basename(sys.argv[0]))[0])
+    atexit.register(tc.report)
+    return tc
+
+# ---------- Call budgets (offline, throwaway SQLite store) ----------
+
+SRC = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(SRC)
+
+def load_yaml(path: str):
+    with open(path, "r") as f:
+        return yaml.safe_load(f)
+
+def _seed(tracking_uri: str, name: str, n_versions: int):
+    """Registered model with n_versions, each backed by a run carrying auc/f1 and serve.* metrics;
+    v1..n-1 were production."""
+    import mlflow
+    mlflow.set_tracking_uri(tracking_uri)
+    client = MlflowClient()
+    exp = client.create_experiment("registry-budget")
+    client.create_registered_model(name)
+    for i in range(1, n_versions + 1):
+        run = client.create_run(exp)
+        client.log_metric(run.info.run_id, "auc", 0.90 + 0.01 * i)
+        client.log_metric(run.info.run_id, "f1", 0.90 + 0.01 * i)
+        # serving metrics as smoke_test/load_test record them, so the gate's latency path is counted too
+        for k, v in {"serve.p95_ms": 20.0, "serve.p99_ms": 40.0, "serve.throughput_rps": 200.0,
+                     "serve.load_s": 1.0, "serve.samples": 600}.items():
+            client.log_metric(run.info.run_id, k, v)
+        client.set_terminated(run.info.run_id)
+        mv = client.create_model_version(name, source=f"runs:/{run.info.run_id}/model", run_id=run.info.run_id)
+        if i < n_versions:
+            client.set_model_version_tag(name, mv.version, "was_production", "true")
+    client.set_registered_model_alias(name, "production", str(n_versions - 1))
+
+# Each scenario runs against a fresh store; commands are the script basenames.
+SCENARIOS = [
+    ("promote", ["src/promote.py", "--candidate-version", "{n}", "--to", "Production", "--dry-run", "false"]),
+    ("rollback", ["src/rollback.py", "--reason", "budget", "check", "--dry-run", "false"]),
+]
+
+def measure(n_versions: int = 10) -> dict:
+    """Run each scenario with REGISTRY_TRACE=json; {command: total_calls} (subprocesses included)."""
+    name = load_yaml(os.path.join(ROOT, "params.yaml"))["registered_model_name"]
+    counts = {}
+    for label, argv in SCENARIOS:
+        with tempfile.TemporaryDirectory() as tmp:
+            for f in ("params.yaml", "policy.yaml"):
+                shutil.copy(os.path.join(ROOT, f), tmp)
+            os.symlink(SRC, os.path.join(tmp, "src"))
+            uri = f"sqlite:///{os.path.join(tmp, 'mlflow.db')}"
+            _seed(uri, name, n_versions)
+            env = {**os.environ, "MLFLOW_TRACKING_URI": uri, "MLFLOW_REGISTRY_URI": uri,
+                   "REGISTRY_TRACE": "json", "REGISTRY_TRACE_DIR": os.path.join(tmp, "trace")}
+            cmd = [sys.executable] + [a.format(n=n_versions) for a in argv]
+            rc = subprocess.call(cmd, cwd=tmp, env=env, stdout=subprocess.DEVNULL)
+            if rc != 0:
+                raise SystemExit(f"[TRACE] scenario {label} exited {rc}")
+            for fn in sorted(os.listdir(env["REGISTRY_TRACE_DIR"])):
+                with open(os.path.join(env["REGISTRY_TRACE_DIR"], fn)) as f:
+                    s = json.load(f)
+                counts[s["command"]] = s["total_calls"]
+                print(f"[TRACE] {label}: {s['command']} made {s['total_calls']} calls "
+                      f"({s['total_ms']:.1f} ms) {json.dumps({m: v['calls'] for m, v in s['by_method'].items()})}")
+    return counts
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--versions", type=int, default=10, help="Registered versions in the seeded store")
+    ap.add_argument("--check", action="store_true", help="Exit 2 if any command exceeds its registry_budgets entry")
+    args = ap.parse_args()
+
+    counts = measure(args.versions)
+    budgets = load_yaml(os.path.join(ROOT, "policy.yaml")).get("registry_budgets", {})
+    over = {c: (n, budgets[c]) for c, n in counts.items() if c in budgets and n > budgets[c]}
+    for c in sorted(set(counts) - set(budgets)):
+        print(f"[TRACE] no budget for {c} ({counts[c]} calls)")
+    if over:
+        for c, (n, b) in over.items():
+            print(f"[TRACE] OVER BUDGET {c}: {n} calls > {b}")
+        if args.check:
+            raise SystemExit(2)
+    else:
+        print("[TRACE] All commands within registry call budgets.")
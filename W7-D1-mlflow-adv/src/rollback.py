@@ -1,7 +1,8 @@
 import os, argparse, json, sys, yaml
+import requests
 from datetime import datetime, timezone
 import mlflow
-from mlflow import MlflowClient
+from registry_trace import traced_client
 
 AUDIT_PATH = "logs/audit.jsonl"
 
@@ -42,7 +43,22 @@ def last_prev_from_audit(model_name: str):
     return None
 
 
-def main(reason: str, dry_run: bool, requested_by: str):
+def swap_replicas(replicas: list, expect_version: str, timeout_s: float = 5.0) -> dict:
+    """Flip each serving replica to its warm standby (POST /admin/swap); {replica: result}."""
+    token = os.getenv("ADMIN_TOKEN", "")
+    results = {}
+    for base in replicas:
+        try:
+            r = requests.post(f"{base.rstrip('/')}/admin/swap", params={"expect_version": expect_version},
+                              headers={"X-Admin-Token": token}, timeout=timeout_s)
+            results[base] = r.json() if r.ok else {"error": f"HTTP {r.status_code}: {r.text[:200]}"}
+        except requests.RequestException as e:
+            results[base] = {"error": str(e)}
+        print(f"[ROLLBACK] swap {base}: {results[base]}")
+    return results
+
+
+def main(reason: str, dry_run: bool, requested_by: str, replicas: list = ()):
     # URIs (default to local if not set)
     tracking_uri = os.getenv("MLFLOW_TRACKING_URI", "http://54.147.138.39:8081")
     registry_uri = os.getenv("MLFLOW_REGISTRY_URI", tracking_uri)
@@ -51,7 +67,7 @@ def main(reason: str, dry_run: bool, requested_by: str):
 
     mlflow.set_tracking_uri(tracking_uri)
     mlflow.set_registry_uri(registry_uri)
-    client = MlflowClient()
+    client = traced_client()
 
     model_name = load_yaml("params.yaml")["registered_model_name"]
 
@@ -80,15 +96,15 @@ def main(reason: str, dry_run: bool, requested_by: str):
 
     # 2) From tags: was_production=true (excluding current)
     if target is None:
+        # search results already carry tags; no per-version get_model_version round trip
         versions = list(client.search_model_versions(f"name='{model_name}'"))
         prior = []
         for v in versions:
             if str(v.version) == str(current_prod.version):
                 continue
-            mv = client.get_model_version(name=model_name, version=str(v.version))
-            tags = getattr(mv, "tags", {}) or {}
+            tags = getattr(v, "tags", {}) or {}
             if str(tags.get("was_production", "")).strip().lower() == "true":
-                prior.append(mv)
+                prior.append(v)
         if prior:
             target = sorted(prior, key=lambda x: int(x.version))[-1]
 
@@ -106,7 +122,7 @@ def main(reason: str, dry_run: bool, requested_by: str):
 
     # Re-point alias to target (non-deprecated)
     try:
-        client.set_registered_model_alias(name=model_name, alias="Staging", version=str(target.version))
+        client.set_registered_model_alias(name=model_name, alias="production", version=str(target.version))
 
         # Optional bookkeeping tags
         client.set_model_version_tag(name=model_name, version=target.version, key="rollback_to", value=str(target.version))
@@ -126,8 +142,16 @@ def main(reason: str, dry_run: bool, requested_by: str):
             "tracking_uri": tracking_uri,
             "registry_uri": registry_uri,
         }
+        # Replicas serve the old production as a warm standby; flip them now instead of waiting for a reload
+        failed = []
+        if replicas:
+            entry["replicas"] = swap_replicas(replicas, str(target.version))
+            failed = [r for r, res in entry["replicas"].items() if "error" in res]
         append_audit(entry)
         print("[ROLLBACK] Completed and audited.")
+        if failed:
+            print(f"[ROLLBACK] Registry updated but swap failed on {failed}; restart those replicas.")
+            sys.exit(2)
         sys.exit(0)
 
     except Exception as e:
@@ -141,6 +165,8 @@ if __name__ == "__main__":
     ap.add_argument("--reason", nargs="+", default=["incident/drift"])
     ap.add_argument("--dry-run", type=str, default="true")  # true|false
     ap.add_argument("--requested-by", type=str, default="samarth")
+    ap.add_argument("--replicas", type=str, default=os.getenv("SERVE_REPLICAS", ""),
+                    help="Comma-separated serve_app base URLs to swap to their warm standby")
     args = ap.parse_args()
 
     reason_str = " ".join(args.reason) if isinstance(args.reason, list) else args.reason
@@ -148,5 +174,6 @@ if __name__ == "__main__":
         reason=reason_str,
         dry_run=str2bool(args.dry_run),
         requested_by=args.requested_by,
+        replicas=[r.strip() for r in args.replicas.split(",") if r.strip()],
     )
 
@@ -1,12 +1,24 @@
-import os, time, json
+import os, sys, time, json, math, random, asyncio, threading, cProfile, pstats, io
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter as TallyCounter, deque
+from types import SimpleNamespace
 from typing import List
 import numpy as np
-from fastapi import FastAPI, HTTPException, Response, Request
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Response, Request, Depends, Header
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
 import mlflow, mlflow.sklearn
+from mlflow.exceptions import MlflowException
+from sklearn.preprocessing import StandardScaler
+try:
+    import orjson  # optional: FAST_JSON codec
+except ImportError:
+    orjson = None
 
 # --- Prometheus metrics ---
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
 
 REQUESTS = Counter("app_requests_total", "Total HTTP requests", ["path", "method", "code"])
 INFER_REQ = Counter("inference_requests_total", "Inference requests", ["code"])
@@ -15,9 +27,17 @@ INFER_LAT = Histogram(
     "Latency for /predict",
     buckets=[0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2]
 )
+ADM_QUEUE = Gauge("predict_queue_depth", "Requests waiting for a /predict slot")
+ADM_INFLIGHT = Gauge("predict_inflight", "Requests holding a /predict slot")
+SHED = Counter("predict_shed_total", "Requests rejected or dropped by admission control", ["reason"])
+EXPLAIN_REQ = Counter("explain_requests_total", "Explain requests", ["method", "code"])
+MODEL_LOAD_S = Gauge("model_load_seconds", "Time to load the live model at boot")
+WARMUP_S = Gauge("model_warmup_seconds", "Time spent in synthetic warm-up before ready")
+WARMUP_BATCH_MS = Gauge("model_warmup_batch_ms", "Last warm-up round latency per batch size", ["batch"])
+READY = Gauge("model_ready", "1 once the model is loaded and warmed up")
 
 # ---------- Config ----------
-MODEL_STAGE = os.getenv("MODEL_STAGE", "Staging")   # Staging or Production
+MODEL_STAGE = os.getenv("MODEL_STAGE", "Staging")   # Staging or Production, or a pinned version number
 MLFLOW_TRACKING_URI = os.getenv("MLFLOW_TRACKING_URI", "http://54.147.138.39:8081")
 try:
     import yaml
@@ -25,14 +45,60 @@ try:
         MODEL_NAME = yaml.safe_load(f)["registered_model_name"]
 except Exception:
     MODEL_NAME = os.getenv("MODEL_NAME", "w7d1_cancer_classifier")
-MODEL_URI = f"models:/{MODEL_NAME}/{MODEL_STAGE}"
+# Served through the registry alias promote.py/rollback.py move (Production -> @production),
+# resolved to a concrete version at boot; a numeric MODEL_STAGE pins that version
+MODEL_REF = MODEL_STAGE if MODEL_STAGE.isdigit() else os.getenv("MODEL_ALIAS", MODEL_STAGE.lower())
+MODEL_URI = f"models:/{MODEL_NAME}/{MODEL_REF}" if MODEL_REF.isdigit() else f"models:/{MODEL_NAME}@{MODEL_REF}"
+# Warm standby for instant rollback: "auto" = newest other version tagged was_production=true,
+# a version number / models:/ URI = that model, "off" = none
+STANDBY = os.getenv("STANDBY", "auto")
 
 LOG_PATH = "logs/requests.jsonl"
+SLOW_LOG_PATH = "logs/slow_requests.jsonl"
 os.makedirs("logs", exist_ok=True)
 
+# Admin surface (profiling, slow-request log) is disabled unless a token is set
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+# 0 = slow-request log off; can be changed at runtime via /admin/slowlog
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+
+# Admission control for /predict: at most MAX_INFLIGHT in flight, MAX_QUEUE waiting, the rest
+# get 429. MAX_INFLIGHT=0 disables it. Clients may send X-Request-Timeout-Ms (relative budget).
+MAX_INFLIGHT = int(os.getenv("MAX_INFLIGHT", "8"))
+MAX_QUEUE = int(os.getenv("MAX_QUEUE", "32"))
+RETRY_AFTER_S = int(os.getenv("RETRY_AFTER_S", "1"))
+DEADLINE_HEADER = "x-request-timeout-ms"
+
+# /predict codec: 1 = decode the body with orjson straight into a float64 array and encode the
+# numpy outputs directly (needs orjson); 0 = pydantic request/response models
+FAST_JSON = os.getenv("FAST_JSON", "0") == "1"
+
+# /explain: fraction of requests whose explanations are logged with the drift sample; non-linear
+# models are explained by occlusion on a single background worker, capped in rows and time
+EXPLAIN_LOG_RATE = float(os.getenv("EXPLAIN_LOG_RATE", "0"))
+EXPLAIN_MAX_ROWS = int(os.getenv("EXPLAIN_MAX_ROWS", "256"))
+EXPLAIN_TIMEOUT_S = float(os.getenv("EXPLAIN_TIMEOUT_S", "5"))
+EXPLAIN_MAX_PENDING = int(os.getenv("EXPLAIN_MAX_PENDING", "2"))
+REFERENCE_PATH = "outputs/reference_bins.json"
+
+# Warm-up before /readyz turns 200: WARMUP_ROUNDS passes of synthetic batches of each size
+# through the request path (no drift log, no inference metrics). Empty = ready right after load.
+WARMUP_BATCHES = [int(b) for b in os.getenv("WARMUP_BATCHES", "1,32,256").split(",") if b.strip()]
+WARMUP_ROUNDS = int(os.getenv("WARMUP_ROUNDS", "3"))
+
 app = FastAPI(title="W7 Inference Service", version="0.2.0")
 model = None
 n_features = None
+load_s = None
+warmup_s = None
+# starting -> loading -> warming -> ready; failed if the load or warm-up raised
+phase = "starting"
+boot_error = None
+live_uri = MODEL_URI
+live_version = None
+# standby = {"model", "n_features", "uri", "version"} once loaded
+standby = None
+_swap_lock = threading.Lock()
 
 class PredictRequest(BaseModel):
     rows: List[List[float]]
@@ -44,9 +110,76 @@ class PredictResponse(BaseModel):
     model_stage: str
     model_name: str
 
+class ExplainRequest(BaseModel):
+    rows: List[List[float]]
+    top_k: int = 5  # 0 = all features
+
+class ExplainResponse(BaseModel):
+    method: str  # "linear" (exact log-odds decomposition) or "occlusion" (approximate)
+    base_value: float  # log-odds the contributions are measured from
+    log_odds: List[float]
+    probs: List[float]
+    top_features: List[List[int]]  # per row, feature indices by |contribution| descending
+    top_contributions: List[List[float]]
+    n_features: int
+    model_stage: str
+    model_name: str
+
+# ---------- Admission control (registered before metrics_mw, so it runs inside it) ----------
+_adm = {"inflight": 0, "waiting": 0}
+_slots = asyncio.Semaphore(max(MAX_INFLIGHT, 1))
+
+def _shed(reason: str, code: int, detail: str, headers: dict = None):
+    SHED.labels(reason=reason).inc()
+    INFER_REQ.labels(code=str(code)).inc()
+    return JSONResponse({"detail": detail}, status_code=code, headers=headers)
+
+@app.middleware("http")
+async def admission_mw(request: Request, call_next):
+    if MAX_INFLIGHT <= 0 or request.url.path != "/predict":
+        return await call_next(request)
+
+    deadline = None
+    budget = request.headers.get(DEADLINE_HEADER)
+    if budget is not None:
+        try:
+            budget_ms = float(budget)
+        except ValueError:
+            budget_ms = math.nan
+        # float() also takes "nan", "inf" and negatives: none of them is a usable budget
+        if not math.isfinite(budget_ms) or budget_ms < 0:
+            return JSONResponse({"detail": f"invalid {DEADLINE_HEADER}"}, status_code=400)
+        deadline = time.perf_counter() + budget_ms / 1000.0
+
+    # Reject before the body is even read when every slot and queue position is taken
+    if _adm["inflight"] >= MAX_INFLIGHT and _adm["waiting"] >= MAX_QUEUE:
+        return _shed("queue_full", 429, "overloaded, retry later", {"Retry-After": str(RETRY_AFTER_S)})
+
+    _adm["waiting"] += 1
+    ADM_QUEUE.set(_adm["waiting"])
+    try:
+        timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+        await asyncio.wait_for(_slots.acquire(), timeout)
+    except asyncio.TimeoutError:
+        return _shed("deadline_queued", 504, "deadline exceeded while queued")
+    finally:
+        _adm["waiting"] -= 1
+        ADM_QUEUE.set(_adm["waiting"])
+
+    _adm["inflight"] += 1
+    ADM_INFLIGHT.set(_adm["inflight"])
+    try:
+        request.state.deadline = deadline
+        return await call_next(request)
+    finally:
+        _adm["inflight"] -= 1
+        ADM_INFLIGHT.set(_adm["inflight"])
+        _slots.release()
+
 @app.middleware("http")
 async def metrics_mw(request: Request, call_next):
     start = time.perf_counter()
+    request.state.t_start = start
     try:
         resp = await call_next(request)
         code = resp.status_code
@@ -57,20 +190,313 @@ async def metrics_mw(request: Request, call_next):
         elapsed = time.perf_counter() - start
         REQUESTS.labels(path=request.url.path, method=request.method, code=str(code)).inc()
         # We only observe INFER_LAT inside /predict handler (to avoid bias)
+        if SLOW_REQUEST_MS and elapsed * 1000.0 >= SLOW_REQUEST_MS:
+            _log_slow(request, code, elapsed)
     return resp
 
+# ---------- Slow-request log ----------
+SLOW_RECENT = deque(maxlen=200)
+
+def _log_slow(request: Request, code: int, elapsed: float):
+    st = request.state
+    stages = dict(getattr(st, "stages", {}))
+    if hasattr(st, "t_handler") and hasattr(st, "t_handler_end"):
+        # routing + body decode + pydantic validation / response encode + send
+        stages["pre_handler_ms"] = (st.t_handler - st.t_start) * 1000.0
+        stages["post_handler_ms"] = (st.t_start + elapsed - st.t_handler_end) * 1000.0
+    entry = {"ts": time.time(), "path": request.url.path, "code": code, "total_ms": round(elapsed * 1000.0, 3),
+             "stages_ms": {k: round(v, 3) for k, v in stages.items()},
+             "batch_shape": getattr(st, "batch_shape", None)}
+    SLOW_RECENT.append(entry)
+    try:
+        with open(SLOW_LOG_PATH, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+    except Exception as e:
+        print(f"[WARN] slow log failed: {e}")
+
+# ---------- On-demand profiling ----------
+# One profile at a time. 'deterministic' = cProfile around /predict bodies, one request at a time
+# (per-request profilers merged); 'sampling' = a thread snapshotting every thread's stack, output
+# as folded stacks for flamegraph.pl / speedscope.
+# Only one cProfile may be enabled at once on 3.12+ (it is process-wide there), so overlapping
+# requests run unprofiled instead of failing in enable().
+_prof_lock = threading.Lock()
+_prof_run_lock = threading.Lock()
+_prof = {"id": 0, "mode": None, "active": False, "started": None, "seconds": 0, "stats": None, "result": None,
+         "profiled": 0, "skipped": 0}
+
+def _prof_finish():
+    with _prof_lock:
+        _prof["active"] = False
+        if _prof["mode"] == "deterministic":
+            out = io.StringIO()
+            out.write(f"{_prof['profiled']} /predict requests profiled, "
+                      f"{_prof['skipped']} overlapping requests ran unprofiled\n")
+            if _prof["stats"] is not None:
+                _prof["stats"].stream = out
+                _prof["stats"].sort_stats("cumulative").print_stats(60)
+            else:
+                out.write("no /predict requests during the profile window\n")
+            _prof["result"] = out.getvalue()
+            _prof["stats"] = None
+
+def _sample_stacks(seconds: float, interval_s: float):
+    me = threading.get_ident()
+    tally = TallyCounter()
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        for tid, frame in sys._current_frames().items():
+            if tid == me:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            tally[";".join(reversed(stack))] += 1
+        time.sleep(interval_s)
+    with _prof_lock:
+        _prof["result"] = "".join(f"{k} {v}\n" for k, v in tally.most_common())
+    _prof_finish()
+
+def _profiled(fn):
+    """Run fn under cProfile only while a deterministic profile is active (one bool check otherwise)."""
+    if not (_prof["active"] and _prof["mode"] == "deterministic"):
+        return fn()
+    if not _prof_run_lock.acquire(blocking=False):
+        with _prof_lock:
+            _prof["skipped"] += 1
+        return fn()
+    try:
+        p = cProfile.Profile()
+        try:
+            p.enable()
+        except ValueError:  # another tool (debugger, coverage) owns the profiling hook
+            with _prof_lock:
+                _prof["skipped"] += 1
+            return fn()
+        try:
+            return fn()
+        finally:
+            p.disable()
+            with _prof_lock:
+                if _prof["active"]:
+                    _prof["profiled"] += 1
+                    if _prof["stats"] is None:
+                        _prof["stats"] = pstats.Stats(p)
+                    else:
+                        _prof["stats"].add(p)
+    finally:
+        _prof_run_lock.release()
+
+def require_admin(x_admin_token: str = Header(default="")):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+@app.post("/admin/profile", dependencies=[Depends(require_admin)])
+def start_profile(seconds: float = 10.0, mode: str = "sampling", interval_ms: float = 5.0):
+    if mode not in ("sampling", "deterministic"):
+        raise HTTPException(status_code=400, detail="mode must be sampling|deterministic")
+    seconds = min(max(seconds, 0.1), 300.0)
+    with _prof_lock:
+        if _prof["active"]:
+            raise HTTPException(status_code=409, detail=f"profile {_prof['id']} already running")
+        _prof.update(id=_prof["id"] + 1, mode=mode, active=True, started=time.time(),
+                     seconds=seconds, stats=None, result=None, profiled=0, skipped=0)
+    if mode == "sampling":
+        threading.Thread(target=_sample_stacks, args=(seconds, interval_ms / 1000.0), daemon=True).start()
+    else:
+        timer = threading.Timer(seconds, _prof_finish)
+        timer.daemon = True
+        timer.start()
+    return {"id": _prof["id"], "mode": mode, "seconds": seconds}
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+def get_profile():
+    with _prof_lock:
+        if _prof["active"]:
+            left = max(0.0, _prof["started"] + _prof["seconds"] - time.time())
+            return Response(json.dumps({"id": _prof["id"], "status": "running", "seconds_left": round(left, 1)}),
+                            status_code=202, media_type="application/json")
+        if _prof["result"] is None:
+            raise HTTPException(status_code=404, detail="no profile recorded")
+        ext = "folded" if _prof["mode"] == "sampling" else "txt"
+        return PlainTextResponse(_prof["result"], headers={
+            "Content-Disposition": f'attachment; filename="profile-{_prof["id"]}-{_prof["mode"]}.{ext}"'})
+
+@app.get("/admin/slowlog", dependencies=[Depends(require_admin)])
+def get_slowlog(limit: int = 50):
+    return {"threshold_ms": SLOW_REQUEST_MS, "recent": list(SLOW_RECENT)[-limit:]}
+
+@app.post("/admin/slowlog", dependencies=[Depends(require_admin)])
+def set_slowlog(threshold_ms: float):
+    global SLOW_REQUEST_MS
+    SLOW_REQUEST_MS = max(0.0, threshold_ms)
+    return {"threshold_ms": SLOW_REQUEST_MS}
+
 @app.on_event("startup")
+def start_boot():
+    # Load in the background so the port is bound (and /livez answers) while the model loads
+    threading.Thread(target=_boot, name="boot", daemon=True).start()
+
+def _boot():
+    global phase, boot_error
+    try:
+        phase = "loading"
+        load_model()
+        phase = "warming"
+        _warm_up()
+        phase = "ready"
+        READY.set(1)
+    except Exception as e:
+        phase, boot_error = "failed", f"{type(e).__name__}: {e}"
+        print(f"[BOOT] FAILED in startup: {boot_error}")
+        return
+    if STANDBY != "off":
+        _load_standby(STANDBY)
+
 def load_model():
-    global model, n_features
+    global model, n_features, load_s, live_uri, live_version
+    t0 = time.perf_counter()
     mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
-    model = mlflow.sklearn.load_model(MODEL_URI)
+    live_version = _resolve_version(mlflow.MlflowClient(), MODEL_REF)
+    live_uri = f"models:/{MODEL_NAME}/{live_version}"
+    model = mlflow.sklearn.load_model(live_uri)
     n_features = getattr(model, "n_features_in_", None)
-    print(f"[BOOT] Loaded {MODEL_URI}; n_features={n_features}")
+    load_s = time.perf_counter() - t0
+    MODEL_LOAD_S.set(load_s)
+    print(f"[BOOT] Loaded {MODEL_URI} -> v{live_version}; n_features={n_features}; load_s={load_s:.3f}")
+
+def _warm_up():
+    """Run synthetic batches through the same decode/score/encode path as /predict (and /explain)."""
+    global warmup_s
+    t0 = time.perf_counter()
+    rng = np.random.default_rng(0)
+    nf = n_features or 1
+    for batch in WARMUP_BATCHES:
+        body = json.dumps({"rows": rng.normal(size=(batch, nf)).round(4).tolist()}).encode()
+        for _ in range(WARMUP_ROUNDS):
+            t = time.perf_counter()
+            st = SimpleNamespace(warmup=True)
+            if FAST_JSON:
+                _predict_fast(body, st)
+            else:
+                _predict(PredictRequest.model_validate_json(body), st).model_dump_json()
+            form = _linear_form(model)
+            if form is not None:
+                _top_k(_explain_linear(form, np.array(json.loads(body)["rows"]))[1], 5)
+            WARMUP_BATCH_MS.labels(batch=str(batch)).set((time.perf_counter() - t) * 1000.0)
+    warmup_s = time.perf_counter() - t0
+    WARMUP_S.set(warmup_s)
+    print(f"[BOOT] Warm-up batches={WARMUP_BATCHES} x{WARMUP_ROUNDS} in {warmup_s:.3f}s")
+
+# ---------- Warm standby ----------
+
+def _warm_standby(m) -> float:
+    """The model-specific part of _warm_up (inference, explanations) for a model not yet serving."""
+    t0 = time.perf_counter()
+    rng = np.random.default_rng(0)
+    nf = getattr(m, "n_features_in_", None) or n_features or 1
+    form = _linear_form(m)
+    for batch in WARMUP_BATCHES:
+        X = rng.normal(size=(batch, nf)).round(4)
+        for _ in range(WARMUP_ROUNDS):
+            if hasattr(m, "predict_proba"):
+                m.predict_proba(X)
+            else:
+                m.predict(X)
+            if form is not None:
+                _top_k(_explain_linear(form, X)[1], 5)
+    return time.perf_counter() - t0
+
+def _resolve_version(client, ref: str) -> str:
+    """Concrete version for a version number, an alias or a models:/ URI; LookupError if there is none."""
+    if ref.startswith("models:/"):
+        ref = ref[len("models:/"):]
+        ref = ref.split("@", 1)[1] if "@" in ref else ref.rsplit("/", 1)[-1]
+    try:
+        mv = (client.get_model_version(MODEL_NAME, ref) if ref.isdigit()
+              else client.get_model_version_by_alias(MODEL_NAME, ref))
+    except MlflowException as e:
+        raise LookupError(f"{MODEL_NAME} '{ref}' not found in the registry: {e.message}") from e
+    return str(mv.version)
+
+def _resolve_standby(spec: str):
+    client = mlflow.MlflowClient()
+    if spec != "auto":
+        version = _resolve_version(client, spec)
+        return None if version == live_version else version
+    # auto: the newest previous production that isn't what we're serving
+    prior = [v for v in client.search_model_versions(f"name='{MODEL_NAME}'")
+             if str(v.version) != live_version and (v.tags or {}).get("was_production", "").lower() == "true"]
+    if not prior:
+        return None
+    return str(max(prior, key=lambda v: int(v.version)).version)
+
+def _load_standby(spec: str):
+    global standby
+    try:
+        version = _resolve_standby(spec)
+        if version is None:
+            print(f"[STANDBY] No standby for '{spec}' (none found, or it is the live version).")
+            return
+        uri = f"models:/{MODEL_NAME}/{version}"
+        t0 = time.perf_counter()
+        m = mlflow.sklearn.load_model(uri)
+        load_s = time.perf_counter() - t0
+        # Warm before publishing, so the first requests after /admin/swap don't hit cold paths
+        warm_s = _warm_standby(m)
+        standby = {"model": m, "n_features": getattr(m, "n_features_in_", None), "uri": uri, "version": version}
+        print(f"[STANDBY] Warm standby {uri} loaded in {load_s:.3f}s, warmed in {warm_s:.3f}s")
+    except Exception as e:
+        print(f"[STANDBY] Could not load standby '{spec}': {e}")
+
+@app.post("/admin/swap", dependencies=[Depends(require_admin)])
+def swap(expect_version: str = ""):
+    """Exchange live and standby models (pointer swap, no I/O); calling it again rolls forward."""
+    global model, n_features, live_uri, live_version, standby
+    with _swap_lock:
+        if standby is None:
+            raise HTTPException(status_code=409, detail="no warm standby loaded")
+        if expect_version and standby["version"] != str(expect_version).lstrip("v"):
+            raise HTTPException(status_code=409, detail=f"standby is v{standby['version']}, expected v{expect_version}")
+        if standby["n_features"] != n_features:
+            raise HTTPException(status_code=409, detail="standby feature count differs from live")
+        t0 = time.perf_counter()
+        prev = {"model": model, "n_features": n_features, "uri": live_uri, "version": live_version}
+        model, live_uri, live_version = standby["model"], standby["uri"], standby["version"]
+        standby = prev
+        swap_us = (time.perf_counter() - t0) * 1e6
+    print(f"[STANDBY] Swapped: live=v{live_version} standby=v{standby['version']} ({swap_us:.1f}us)")
+    return {"live": live_uri, "live_version": live_version, "standby": standby["uri"],
+            "standby_version": standby["version"], "swap_us": round(swap_us, 2)}
+
+@app.post("/admin/standby", dependencies=[Depends(require_admin)])
+def set_standby(version: str):
+    """(Re)load the standby in the background, e.g. after a promotion."""
+    threading.Thread(target=_load_standby, args=(version,), daemon=True).start()
+    return {"loading": version}
+
+@app.get("/livez")
+def livez():
+    # Restart only if boot failed; a slow load or warm-up is still alive
+    if phase == "failed":
+        return JSONResponse({"alive": False, "phase": phase, "error": boot_error}, status_code=503)
+    return {"alive": True, "phase": phase}
+
+@app.get("/readyz")
+def readyz():
+    body = {"ready": phase == "ready", "phase": phase, "load_s": load_s, "warmup_s": warmup_s}
+    return JSONResponse(body, status_code=200 if phase == "ready" else 503)
 
 @app.get("/healthz")
 def healthz():
     ok = model is not None
-    return {"ok": ok, "model_uri": MODEL_URI, "n_features": n_features}
+    return {"ok": ok, "ready": phase == "ready", "phase": phase, "model_uri": live_uri,
+            "model_ref": MODEL_URI, "model_version": live_version,
+            "n_features": n_features, "load_s": load_s, "warmup_s": warmup_s,
+            "standby_uri": standby["uri"] if standby else None}
 
 @app.get("/metrics")
 def metrics():
@@ -82,43 +508,301 @@ def _append_request(rows: List[List[float]]):
     with open(LOG_PATH, "a") as f:
         f.write(json.dumps(payload) + "\n")
 
-@app.post("/predict", response_model=PredictResponse)
-def predict(req: PredictRequest):
-    if model is None:
+def predict(req: PredictRequest, request: Request):
+    st = request.state
+    st.t_handler = time.perf_counter()
+    try:
+        return _profiled(lambda: _predict(req, st))
+    finally:
+        st.t_handler_end = time.perf_counter()
+
+async def predict_fast(request: Request):
+    body = await request.body()
+    st = request.state
+    st.t_handler = time.perf_counter()
+    try:
+        return await run_in_threadpool(_profiled, lambda: _predict_fast(body, st))
+    finally:
+        st.t_handler_end = time.perf_counter()
+
+def _live_model():
+    m = model  # one read: a concurrent /admin/swap can't change the model mid-request
+    if m is None:
         INFER_REQ.labels(code="503").inc()
         raise HTTPException(status_code=503, detail="Model not loaded")
-    X = np.array(req.rows, dtype=float)
+    return m
+
+def _score(m, X: np.ndarray, st):
+    """Shape/deadline checks and inference on a 2D float array; returns (probs, preds) arrays."""
+    stages = st.stages
+    st.batch_shape = list(X.shape)
     if X.ndim != 2:
         INFER_REQ.labels(code="400").inc()
         raise HTTPException(status_code=400, detail="rows must be 2D list")
     if n_features is not None and X.shape[1] != n_features:
         INFER_REQ.labels(code="400").inc()
         raise HTTPException(status_code=400, detail=f"Expected {n_features} features, got {X.shape[1]}")
+    _reject_non_finite(X)
+
+    # Work whose caller has already given up is dropped before scoring
+    deadline = getattr(st, "deadline", None)
+    if deadline is not None and time.perf_counter() > deadline:
+        SHED.labels(reason="deadline").inc()
+        INFER_REQ.labels(code="504").inc()
+        raise HTTPException(status_code=504, detail="deadline exceeded before scoring")
 
     t0 = time.perf_counter()
-    if hasattr(model, "predict_proba"):
-        probs = model.predict_proba(X)[:, 1].tolist()
-        preds = (np.array(probs) >= 0.5).astype(int).tolist()
+    if hasattr(m, "predict_proba"):
+        probs = m.predict_proba(X)[:, 1]
+        preds = (probs >= 0.5).astype(int)
     else:
-        preds_arr = model.predict(X)
-        preds = preds_arr.astype(int).tolist() if hasattr(preds_arr, "astype") else list(preds_arr)
+        preds = np.asarray(m.predict(X)).astype(int)
         probs = preds
     dt = time.perf_counter() - t0
+    stages["predict_ms"] = dt * 1000.0
 
-    INFER_LAT.observe(dt)
-    INFER_REQ.labels(code="200").inc()
+    if not getattr(st, "warmup", False):
+        INFER_LAT.observe(dt)
+        INFER_REQ.labels(code="200").inc()
+    return probs, preds
 
-    # Log a tiny sample for drift (keep it light)
+def _log_sample(rows, st):
+    # Log a tiny sample for drift (keep it light); synthetic warm-up rows stay out of it
+    stages = st.stages
+    if getattr(st, "warmup", False):
+        return
+    t = time.perf_counter()
     try:
-        _append_request(req.rows[:2])  # sample first 2 rows
+        _append_request(rows)
     except Exception as e:
         print(f"[WARN] request log failed: {e}")
+    stages["request_log_ms"] = (time.perf_counter() - t) * 1000.0
+
+def _predict(req: PredictRequest, st):
+    stages = st.stages = {}
+    t = time.perf_counter()
+    m = _live_model()
+    try:
+        X = np.array(req.rows, dtype=float)
+    except ValueError:  # ragged rows
+        INFER_REQ.labels(code="400").inc()
+        raise HTTPException(status_code=400, detail="rows must be 2D list")
+    stages["to_array_ms"] = (time.perf_counter() - t) * 1000.0
+    probs, preds = _score(m, X, st)
+    _log_sample(req.rows[:2], st)  # sample first 2 rows
 
     return PredictResponse(
-        probs=[float(p) for p in probs],
-        preds=[int(p) for p in preds],
+        probs=[float(p) for p in probs.tolist()],
+        preds=[int(p) for p in preds.tolist()],
         n_features=int(n_features) if n_features is not None else X.shape[1],
         model_stage=MODEL_STAGE,
         model_name=MODEL_NAME
     )
 
+def _reject_non_finite(X: np.ndarray):
+    # JSON NaN/1e400 pass float validation but break the model; answer like a pydantic finite_number error
+    bad = ~np.isfinite(X)
+    if bad.any():
+        i, j = (int(v) for v in np.argwhere(bad)[0])
+        raise RequestValidationError([{"type": "finite_number", "loc": ("body", "rows", i, j),
+                                       "msg": "Input should be a finite number", "input": str(X[i, j])}])
+
+def _fast_rows(body: bytes):
+    """Contiguous float64 (n, d) array straight from the body, or None if it isn't a clean numeric 2D list."""
+    try:
+        X = np.asarray(orjson.loads(body)["rows"])
+    except (ValueError, KeyError, TypeError):  # bad JSON, no "rows", not an object, ragged rows
+        return None
+    # null/strings give object/str dtypes, bool-only rows kind "b": all go to the pydantic path
+    if X.ndim != 2 or X.dtype.kind not in "fiu" or not np.isfinite(X).all():
+        return None
+    return np.ascontiguousarray(X, dtype=np.float64)
+
+def _validate_body(body: bytes) -> PredictRequest:
+    """PredictRequest from raw bytes, failing with the same RequestValidationError FastAPI raises."""
+    if not body:
+        raise RequestValidationError([{"type": "missing", "loc": ("body",), "msg": "Field required", "input": None}])
+    try:
+        obj = json.loads(body)
+    except json.JSONDecodeError as e:
+        raise RequestValidationError([{"type": "json_invalid", "loc": ("body", e.pos), "msg": "JSON decode error",
+                                       "input": {}, "ctx": {"error": e.msg}}])
+    try:
+        return PredictRequest.model_validate(obj, from_attributes=True)  # as FastAPI validates bodies
+    except ValidationError as e:
+        raise RequestValidationError([{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)])
+
+def _predict_fast(body: bytes, st):
+    """Same contract as _predict; body -> float64 array -> JSON without pydantic or per-element lists."""
+    stages = st.stages = {}
+    t = time.perf_counter()
+    m = _live_model()
+    X = _fast_rows(body)
+    if X is None:
+        # Only well-formed bodies take the fast route; everything else gets the pydantic path's
+        # exact status codes and error bodies
+        return _predict(_validate_body(body), st)
+    stages["to_array_ms"] = (time.perf_counter() - t) * 1000.0
+    probs, preds = _score(m, X, st)
+    _log_sample(X[:2].tolist(), st)
+
+    t = time.perf_counter()
+    out = orjson.dumps({
+        "probs": np.ascontiguousarray(probs, dtype=np.float64),
+        "preds": np.ascontiguousarray(preds, dtype=np.int64),
+        "n_features": int(n_features) if n_features is not None else X.shape[1],
+        "model_stage": MODEL_STAGE,
+        "model_name": MODEL_NAME,
+    }, option=orjson.OPT_SERIALIZE_NUMPY)
+    stages["encode_ms"] = (time.perf_counter() - t) * 1000.0
+    return Response(content=out, media_type="application/json")
+
+def use_fast_json(enabled: bool):
+    """Bind POST /predict to the orjson/numpy codec or to the pydantic path (same response schema)."""
+    global FAST_JSON
+    if enabled and orjson is None:
+        print("[WARN] FAST_JSON requested but orjson is not installed; using the pydantic path")
+        enabled = False
+    FAST_JSON = enabled
+    app.router.routes = [r for r in app.router.routes if getattr(r, "path", None) != "/predict"]
+    if enabled:
+        body_schema = {"content": {"application/json": {"schema": PredictRequest.model_json_schema()}},
+                       "required": True}
+        app.add_api_route("/predict", predict_fast, methods=["POST"], response_model=PredictResponse,
+                          openapi_extra={"requestBody": body_schema})
+    else:
+        app.add_api_route("/predict", predict, methods=["POST"], response_model=PredictResponse)
+
+use_fast_json(FAST_JSON)
+
+# ---------- Explanations ----------
+
+_explain_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+_explain_slots = threading.BoundedSemaphore(EXPLAIN_MAX_PENDING)
+
+def _linear_form(m):
+    """(center, weights, intercept) with log-odds = intercept + sum((x - center) * weights), or None.
+
+    Covers a bare binary linear classifier and [StandardScaler ->] classifier pipelines, where
+    (x - mean) / scale * coef == (x - mean) * (coef / scale); mean is 0 without with_mean, scale 1
+    without with_std (sklearn still fits mean_ in the first case).
+    """
+    steps = [s for _, s in m.steps] if hasattr(m, "steps") else [m]
+    *pre, clf = steps
+    coef = getattr(clf, "coef_", None)
+    if coef is None or coef.shape[0] != 1 or len(pre) > 1:
+        return None
+    w = np.asarray(coef[0], dtype=np.float64)
+    center = np.zeros_like(w)
+    if pre:
+        if not isinstance(pre[0], StandardScaler):
+            return None
+        sc = pre[0]
+        center = _scaler_center(sc, len(w))
+        if sc.with_std:
+            w = w / sc.scale_
+    return center, w, float(clf.intercept_[0])
+
+def _scaler_center(sc: StandardScaler, d: int) -> np.ndarray:
+    """Raw-space point the scaler maps to 0 on every feature it centers."""
+    return np.asarray(sc.mean_ if sc.with_mean else np.zeros(d), dtype=np.float64)
+
+def _top_k(contrib: np.ndarray, k: int):
+    """Per-row indices and values of the k largest |contributions|, sorted, without a Python loop."""
+    d = contrib.shape[1]
+    k = d if k <= 0 or k >= d else k
+    mag = np.abs(contrib)
+    idx = np.argpartition(-mag, k - 1, axis=1)[:, :k] if k < d else np.tile(np.arange(d), (len(contrib), 1))
+    order = np.argsort(-np.take_along_axis(mag, idx, axis=1), axis=1, kind="stable")
+    idx = np.take_along_axis(idx, order, axis=1)
+    return idx, np.take_along_axis(contrib, idx, axis=1)
+
+def _logit(p: np.ndarray) -> np.ndarray:
+    p = np.clip(p, 1e-12, 1 - 1e-12)
+    return np.log(p / (1 - p))
+
+def _background(m):
+    """Reference point for occlusion: the pipeline scaler's center, else medians from reference_bins.json."""
+    first = m.steps[0][1] if hasattr(m, "steps") else None
+    if isinstance(first, StandardScaler):
+        return _scaler_center(first, first.n_features_in_)
+    if os.path.exists(REFERENCE_PATH):
+        with open(REFERENCE_PATH) as f:
+            ref = json.load(f)
+        return np.array([np.interp(0.5, np.concatenate([[0.0], np.cumsum(ft["ref_p"])]), ft["edges"])
+                         for ft in ref["features"]])
+    return None
+
+def _occlusion(m, X: np.ndarray, bg: np.ndarray):
+    """Log-odds change from resetting each feature to the background, all rows x features in one predict."""
+    n, d = X.shape
+    Xs = np.repeat(X[None, :, :], d + 1, axis=0)  # (d+1, n, d): slot 0 = original rows
+    Xs[np.arange(1, d + 1), :, np.arange(d)] = bg[:, None]
+    p = m.predict_proba(np.vstack([Xs.reshape(-1, d), bg[None, :]]))[:, 1]
+    lo = _logit(p[:-1]).reshape(d + 1, n)
+    return lo[0], (lo[0][None, :] - lo[1:]).T, float(_logit(p[-1:])[0])
+
+def _explain_linear(form, X: np.ndarray):
+    center, w, b = form
+    contrib = (X - center) * w  # exact: rows sum to log_odds - b
+    return b + contrib.sum(axis=1), contrib, b
+
+def _log_explanations(X: np.ndarray, log_odds, idx, vals):
+    try:
+        with open(LOG_PATH, "a") as f:
+            # not "rows": drift_check reads those as live traffic, and these are disputed rows seen twice
+            f.write(json.dumps({"ts": time.time(), "explain_rows": X[:2].tolist(),
+                                "explain": {"log_odds": log_odds[:2].tolist(), "top_features": idx[:2].tolist(),
+                                            "top_contributions": vals[:2].tolist()}}) + "\n")
+    except Exception as e:
+        print(f"[WARN] explanation log failed: {e}")
+
+@app.post("/explain", response_model=ExplainResponse)
+async def explain(req: ExplainRequest):
+    m = model
+    if m is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    try:
+        X = np.array(req.rows, dtype=np.float64)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="rows must be 2D list")
+    if X.ndim != 2 or (n_features is not None and X.shape[1] != n_features):
+        raise HTTPException(status_code=400, detail=f"rows must be 2D with {n_features} features")
+    _reject_non_finite(X)
+
+    form = _linear_form(m)
+    if form is not None:
+        method = "linear"
+        log_odds, contrib, base = await run_in_threadpool(_explain_linear, form, X)
+    else:
+        method = "occlusion"
+        bg = _background(m)
+        if bg is None or not hasattr(m, "predict_proba"):
+            EXPLAIN_REQ.labels(method=method, code="501").inc()
+            raise HTTPException(status_code=501, detail="no background for occlusion; run build_reference.py")
+        if bg.shape != (X.shape[1],):
+            EXPLAIN_REQ.labels(method=method, code="501").inc()
+            raise HTTPException(status_code=501, detail=f"occlusion background has {bg.shape[0]} features, model has "
+                                                        f"{X.shape[1]}; rebuild with build_reference.py")
+        if len(X) > EXPLAIN_MAX_ROWS:
+            EXPLAIN_REQ.labels(method=method, code="413").inc()
+            raise HTTPException(status_code=413, detail=f"non-linear explain is capped at {EXPLAIN_MAX_ROWS} rows")
+        if not _explain_slots.acquire(blocking=False):
+            EXPLAIN_REQ.labels(method=method, code="429").inc()
+            raise HTTPException(status_code=429, detail="explain worker busy", headers={"Retry-After": str(RETRY_AFTER_S)})
+        fut = _explain_pool.submit(_occlusion, m, X, bg)
+        fut.add_done_callback(lambda _: _explain_slots.release())
+        try:
+            log_odds, contrib, base = await asyncio.wait_for(asyncio.wrap_future(fut), EXPLAIN_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            EXPLAIN_REQ.labels(method=method, code="504").inc()
+            raise HTTPException(status_code=504, detail="explanation timed out")
+
+    idx, vals = _top_k(contrib, req.top_k)
+    EXPLAIN_REQ.labels(method=method, code="200").inc()
+    if EXPLAIN_LOG_RATE > 0 and random.random() < EXPLAIN_LOG_RATE:
+        _log_explanations(X, log_odds, idx, vals)
+    return ExplainResponse(method=method, base_value=base, log_odds=log_odds.tolist(),
+                           probs=(1.0 / (1.0 + np.exp(-log_odds))).tolist(),
+                           top_features=idx.tolist(), top_contributions=vals.tolist(),
+                           n_features=X.shape[1], model_stage=MODEL_STAGE, model_name=MODEL_NAME)
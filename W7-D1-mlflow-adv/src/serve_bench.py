@@ -0,0 +1,202 @@
+import argparse, asyncio, json, os, platform, statistics, tempfile, time
+from types import SimpleNamespace
+import httpx
+import numpy as np
+from starlette.requests import Request
+from starlette.responses import Response
+
+import serve_app
+
+REPORT = "outputs/serve_microbench.json"
+CODEC_REPORT = "outputs/serve_codec_bench.json"
+
+class StubModel:
+    """Deterministic stand-in with the same surface as the sklearn pipeline (no MLflow, no training)."""
+
+    def __init__(self, n_features: int = 30, seed: int = 0):
+        self.n_features_in_ = n_features
+        self.coef_ = np.random.default_rng(seed).normal(size=n_features)
+
+    def predict_proba(self, X):
+        p = 1.0 / (1.0 + np.exp(-(np.asarray(X) @ self.coef_)))
+        return np.column_stack([1.0 - p, p])
+
+def local_pipeline():
+    from train import build_model
+    from dataset_cache import load_dataset
+    X, y, _ = load_dataset()
+    return build_model(seed=0).fit(np.asarray(X), np.asarray(y))
+
+def install_model(model):
+    serve_app.model = model
+    serve_app.n_features = getattr(model, "n_features_in_", None)
+
+def time_call(fn, number: int, repeat: int) -> dict:
+    """Per-call µs over `repeat` rounds of `number` calls (min is the least noisy, median the typical)."""
+    rounds = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - t0) / number * 1e6)
+    return {"min_us": round(min(rounds), 2), "median_us": round(statistics.median(rounds), 2)}
+
+def time_stages(handler, number: int, repeat: int) -> dict:
+    """Per-call µs of each stage serve_app records in st.stages, plus the whole handler call."""
+    rounds = {}
+    for _ in range(repeat):
+        sums = {}
+        t0 = time.perf_counter()
+        for _ in range(number):
+            st = SimpleNamespace(deadline=None)
+            handler(st)
+            for k, v in st.stages.items():
+                sums[k] = sums.get(k, 0.0) + v
+        sums["handler_ms"] = (time.perf_counter() - t0) * 1000.0
+        for k, v in sums.items():
+            rounds.setdefault(k[:-len("_ms")], []).append(v / number * 1000.0)
+    return {k: {"min_us": round(min(v), 2), "median_us": round(statistics.median(v), 2)} for k, v in rounds.items()}
+
+def stage_fns(batch: int, n_features: int, loop: asyncio.AbstractEventLoop):
+    """(handlers, fns): the real /predict handler bodies, timed per stage, and whole-call timings."""
+    rows = np.random.default_rng(batch).normal(size=(batch, n_features)).round(4).tolist()
+    body = json.dumps({"rows": rows}).encode()
+    req = serve_app.PredictRequest.model_validate(json.loads(body))
+
+    # What the routes run once FastAPI has parsed the request (pydantic) or read the body (fast)
+    handlers = {"pydantic": lambda st: serve_app._predict(req, st)}
+    if serve_app.orjson is not None:
+        handlers["fast_json"] = lambda st: serve_app._predict_fast(body, st)
+
+    scope = {"type": "http", "method": "POST", "path": "/predict", "headers": [], "query_string": b""}
+    async def call_next(_request):
+        return Response(status_code=200)
+    def middleware():
+        loop.run_until_complete(serve_app.metrics_mw(Request(scope), call_next))
+
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=serve_app.app), base_url="http://bench")
+    def end_to_end():
+        r = loop.run_until_complete(client.post("/predict", content=body,
+                                                headers={"content-type": "application/json"}))
+        assert r.status_code == 200, r.text
+
+    return handlers, {"middleware": middleware, "end_to_end": end_to_end}
+
+def run(model_kind: str, batches: list, number: int, repeat: int) -> dict:
+    install_model(StubModel() if model_kind == "stub" else local_pipeline())
+    n_features = int(serve_app.n_features)
+    results = {}
+    loop = asyncio.new_event_loop()
+    # keep the drift sample log out of logs/requests.jsonl
+    with tempfile.TemporaryDirectory() as tmp:
+        serve_app.LOG_PATH = os.path.join(tmp, "requests.jsonl")
+        for batch in batches:
+            handlers, fns = stage_fns(batch, n_features, loop)
+            res = results[str(batch)] = {}
+            for path, handler in handlers.items():
+                handler(SimpleNamespace(deadline=None))  # warm-up
+                for stage, t in time_stages(handler, number, repeat).items():
+                    res[f"{path}.{stage}"] = t
+            for stage, fn in fns.items():
+                fn()  # warm-up
+                res[stage] = time_call(fn, number, repeat)
+            for stage, t in res.items():
+                print(f"[MICRO] batch={batch:<6} {stage:<24} "
+                      f"min={t['min_us']:>10.2f}us median={t['median_us']:>10.2f}us")
+    loop.close()
+    return {"model": model_kind, "n_features": n_features, "number": number, "repeat": repeat,
+            "python": platform.python_version(), "machine": platform.machine(),
+            "cpu_count": os.cpu_count(), "ts": time.time(), "results": results}
+
+def codec_compare(model_kind: str, batches: list, number: int, repeat: int) -> dict:
+    """End-to-end /predict with the pydantic codec vs FAST_JSON, same payloads, identical responses asserted."""
+    install_model(StubModel() if model_kind == "stub" else local_pipeline())
+    n_features = int(serve_app.n_features)
+    loop = asyncio.new_event_loop()
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=serve_app.app), base_url="http://bench")
+    headers = {"content-type": "application/json"}
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        serve_app.LOG_PATH = os.path.join(tmp, "requests.jsonl")
+        for batch in batches:
+            body = json.dumps({"rows": np.random.default_rng(batch).normal(size=(batch, n_features))
+                               .round(4).tolist()}).encode()
+            calls = max(3, min(number, 20000 // batch))  # keep 10k-row batches affordable
+            row, outputs = {}, {}
+            for codec, fast in (("pydantic", False), ("fast_json", True)):
+                serve_app.use_fast_json(fast)
+                def post():
+                    r = loop.run_until_complete(client.post("/predict", content=body, headers=headers))
+                    assert r.status_code == 200, r.text
+                    return r
+                outputs[codec] = post().json()
+                row[codec] = time_call(post, calls, repeat)
+            a, b = outputs["pydantic"], outputs["fast_json"]
+            assert a["preds"] == b["preds"] and np.allclose(a["probs"], b["probs"], rtol=0, atol=1e-15), \
+                f"codec outputs differ at batch={batch}"
+            row["speedup"] = round(row["pydantic"]["median_us"] / row["fast_json"]["median_us"], 2)
+            results[str(batch)] = row
+            print(f"[MICRO] batch={batch:<6} pydantic={row['pydantic']['median_us']:>12.1f}us "
+                  f"fast_json={row['fast_json']['median_us']:>12.1f}us speedup={row['speedup']}x")
+    serve_app.use_fast_json(False)
+    loop.close()
+    return {"model": model_kind, "n_features": n_features, "repeat": repeat,
+            "python": platform.python_version(), "machine": platform.machine(),
+            "cpu_count": os.cpu_count(), "ts": time.time(), "codec": results}
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    problems = []
+    for batch, stages in report["results"].items():
+        for stage, cur in stages.items():
+            base = baseline.get("results", {}).get(batch, {}).get(stage)
+            if base and cur["median_us"] > base["median_us"] * (1.0 + tolerance):
+                problems.append(f"batch={batch} {stage}: {cur['median_us']}us > "
+                                f"baseline {base['median_us']}us +{tolerance:.0%}")
+    return problems
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model", choices=["stub", "local"], default="stub",
+                    help="stub: deterministic fake; local: StandardScaler->LogisticRegression fit on the cached dataset")
+    ap.add_argument("--batches", default="1,100,1000")
+    ap.add_argument("--number", type=int, default=200, help="calls per round")
+    ap.add_argument("--repeat", type=int, default=5, help="rounds per stage")
+    ap.add_argument("--out", default=REPORT)
+    ap.add_argument("--baseline", default="", help="Report to compare against; exit 2 on regression")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative median increase")
+    ap.add_argument("--codec", action="store_true",
+                    help="Compare /predict end to end with and without FAST_JSON (default batches 1..10000)")
+    args = ap.parse_args()
+
+    if args.codec:
+        batches = args.batches if args.batches != ap.get_default("batches") else "1,10,100,1000,10000"
+        report = codec_compare(args.model, [int(b) for b in batches.split(",") if b.strip()],
+                               args.number, args.repeat)
+        out = args.out if args.out != REPORT else CODEC_REPORT
+        os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+        with open(out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[MICRO] wrote {out}")
+        return
+
+    report = run(args.model, [int(b) for b in args.batches.split(",") if b.strip()], args.number, args.repeat)
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[MICRO] wrote {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("model") != report["model"]:
+            raise SystemExit(f"[MICRO] baseline model={baseline.get('model')} != {report['model']}")
+        problems = compare(report, baseline, args.tolerance)
+        if problems:
+            print("[MICRO] REGRESSION vs baseline:")
+            for p in problems:
+                print("  -", p)
+            raise SystemExit(2)
+        print("[MICRO] No regression vs baseline.")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
-import argparse, asyncio, time, statistics, json, os
+import argparse, asyncio, json
 import httpx
-import numpy as np
+from load_test import open_loop, wait_ready
 
 DEFAULT_PAYLOAD = {
   # Provide 2 sample rows (length will be checked against model.n_features_in_)
@@ -10,64 +10,57 @@ DEFAULT_PAYLOAD = {
   ]
 }
 
-async def one_call(client, url, payload):
-  t0 = time.perf_counter()
-  r = await client.post(url, json=payload)
-  dt = (time.perf_counter() - t0) * 1000.0
-  return r.status_code, dt, r.text
-
-async def run(base_url, requests, concurrency, p95_budget_ms):
+async def run(base_url, requests, concurrency, p95_budget_ms, rate, record_version=None, ready_timeout_s=60.0):
   # 1) Health
   async with httpx.AsyncClient(timeout=10.0) as c:
+    if not await wait_ready(c, base_url, ready_timeout_s, tag="SMOKE"):
+      return 1
     h = await c.get(f"{base_url}/healthz")
     if h.status_code != 200:
       print(f"[SMOKE] /healthz failed: {h.status_code} {h.text}")
       return 1
     print(f"[SMOKE] /healthz OK: {h.text[:120]}...")
+    load_s = h.json().get("load_s")
 
-  # 2) Predict load
-  latencies = []
-  ok = 0
-  payload = DEFAULT_PAYLOAD
-
-  async def worker(sem, tasks_done):
-    nonlocal ok
-    async with httpx.AsyncClient(timeout=10.0) as c:
-      while True:
-        async with sem:
-          if tasks_done["n"] >= requests:
-            return
-          tasks_done["n"] += 1
-        code, dt, body = await one_call(c, f"{base_url}/predict", payload)
-        latencies.append(dt)
-        if code == 200:
-          ok += 1
-
-  sem = asyncio.Semaphore(concurrency)
-  tasks_done = {"n": 0}
-  workers = [asyncio.create_task(worker(sem, tasks_done)) for _ in range(concurrency)]
-  await asyncio.gather(*workers)
+  # 2) Predict load: open loop at a fixed arrival rate (closed-loop workers hide queueing)
+  limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+  async with httpx.AsyncClient(limits=limits) as c:
+    res = await open_loop(c, f"{base_url}/predict", json.dumps(DEFAULT_PAYLOAD).encode(), rate, requests)
 
-  if ok == 0:
+  if res["ok"] == 0:
     print("[SMOKE] All predict calls failed")
     return 1
 
-  p95 = float(np.percentile(latencies, 95))
-  res = {
+  lat = res["hist"].summary()
+  out = {
     "requests": requests,
-    "ok": ok,
-    "p95_ms": round(p95, 2),
+    "ok": res["ok"],
+    "rate": rate,
+    "achieved_rps": round(res["achieved_rps"], 2),
+    "p50_ms": lat["p50_ms"],
+    "p95_ms": lat["p95_ms"],
+    "p99_ms": lat["p99_ms"],
+    "max_ms": lat["max_ms"],
     "budget_ms": p95_budget_ms
   }
-  print("[SMOKE] Result:", json.dumps(res))
-  return 0 if p95 <= p95_budget_ms else 2
+  print("[SMOKE] Result:", json.dumps(out))
+  if record_version:
+    from perf_record import record_serving_metrics
+    record_serving_metrics(record_version, {"serve.p95_ms": lat["p95_ms"], "serve.p99_ms": lat["p99_ms"],
+                                            "serve.load_s": load_s, "serve.samples": res["ok"]},
+                           source="smoke_test")
+  return 0 if lat["p95_ms"] <= p95_budget_ms else 2
 
 if __name__ == "__main__":
   ap = argparse.ArgumentParser()
   ap.add_argument("--base-url", default="http://54.147.138.39:8086")
   ap.add_argument("--requests", type=int, default=50)
-  ap.add_argument("--concurrency", type=int, default=5)
+  ap.add_argument("--concurrency", type=int, default=5, help="max open connections")
+  ap.add_argument("--rate", type=float, default=20.0, help="offered load, requests/s")
   ap.add_argument("--p95-budget-ms", type=float, default=200.0)
+  ap.add_argument("--record-version", type=int, default=None, help="log p95/p99/load time on this model version")
+  ap.add_argument("--ready-timeout", type=float, default=60.0, help="seconds to wait for /readyz")
   args = ap.parse_args()
-  raise SystemExit(asyncio.run(run(args.base_url, args.requests, args.concurrency, args.p95_budget_ms)))
+  raise SystemExit(asyncio.run(run(args.base_url, args.requests, args.concurrency, args.p95_budget_ms, args.rate,
+                               args.record_version, args.ready_timeout)))
 
@@ -1,6 +1,6 @@
 import os, argparse, yaml, json, subprocess
 import mlflow
-from mlflow.tracking import MlflowClient
+from registry_trace import traced_client
 
 def load_yaml(path):
     with open(path, "r") as f: return yaml.safe_load(f)
@@ -33,7 +33,7 @@ def parse_kv_list(kv: str):
 def main(version: int, extra: str, stage: str):
     os.environ.setdefault("MLFLOW_TRACKING_URI", os.getenv("MLFLOW_TRACKING_URI","http://54.147.138.39:8081"))
     mlflow.set_tracking_uri(os.environ["MLFLOW_TRACKING_URI"])
-    client = MlflowClient()
+    client = traced_client()
 
     params = load_yaml("params.yaml")
     name = params["registered_model_name"]
@@ -1,46 +1,67 @@
-import os, json, argparse, yaml
+import os, json, argparse, itertools, time, tracemalloc, yaml
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 import mlflow
 import mlflow.sklearn
 import sklearn
-from sklearn.datasets import load_breast_cancer
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import make_pipeline
 from sklearn.metrics import roc_auc_score, f1_score
+from dataset_cache import file_fingerprint, holdout_indices, holdout_spec, load_dataset, split_indices
+
+RUN_TAGS = {
+    "data.name": "sklearn_breast_cancer",
+    "purpose": "W7D1-mlflow-adv",
+    "owner": "samarth",
+    "candidate": "true"
+}
 
 def load_cfg():
     with open("params.yaml", "r") as f:
         return yaml.safe_load(f)
 
+def load_policy():
+    with open("policy.yaml", "r") as f:
+        return yaml.safe_load(f)
+
+def build_model(seed: int, C: float = 1.0, max_iter: int = 1000):
+    # Scale features + give the solver more iterations to avoid ConvergenceWarning
+    return make_pipeline(
+        StandardScaler(),
+        LogisticRegression(C=C, max_iter=max_iter, random_state=seed, solver="lbfgs", n_jobs=None)
+    )
+
+def score_metrics(y_test, y_prob) -> dict:
+    y_pred = (y_prob >= 0.5).astype(int)
+    return {"auc": float(roc_auc_score(y_test, y_prob)), "f1": float(f1_score(y_test, y_pred))}
+
+def evaluate(model, X_test, y_test) -> dict:
+    return score_metrics(y_test, model.predict_proba(X_test)[:, 1])
+
+def holdout_tag(holdout) -> str:
+    # Recorded on every run so the eval gate can tell whether a version ever saw the holdout
+    return f"f{holdout[0]}_s{holdout[1]}" if holdout else "none"
+
 def main(seed: int):
     cfg = load_cfg()
     os.environ.setdefault("MLFLOW_TRACKING_URI", os.getenv("MLFLOW_TRACKING_URI", "http://127.0.0.1:5001"))
     mlflow.set_tracking_uri(os.environ["MLFLOW_TRACKING_URI"])
     mlflow.set_experiment(cfg["experiment_name"])
 
-    data = load_breast_cancer()
-    X, y = data.data, data.target
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=cfg["test_size"], random_state=seed, stratify=y
-    )
+    X, y, data_fp = load_dataset()
+    holdout = holdout_spec(cfg)
+    tr, te = split_indices(y, data_fp, seed, cfg["test_size"], holdout=holdout)
+    X_train, X_test, y_train, y_test = X[tr], X[te], y[tr], y[te]
 
-    # Scale features + give the solver more iterations to avoid ConvergenceWarning
-    model = make_pipeline(
-        StandardScaler(),
-        LogisticRegression(max_iter=1000, random_state=seed, solver="lbfgs", n_jobs=None)
-    )
+    model = build_model(seed)
 
     with mlflow.start_run() as run:
         model.fit(X_train, y_train)
 
-        y_prob = model.predict_proba(X_test)[:, 1]
-        y_pred = (y_prob >= 0.5).astype(int)
-
-        auc = roc_auc_score(y_test, y_prob)
-        f1 = f1_score(y_test, y_pred)
+        metrics = evaluate(model, X_test, y_test)
+        auc, f1 = metrics["auc"], metrics["f1"]
 
         # Log metrics and params
         mlflow.log_params({
@@ -69,18 +90,336 @@ def main(seed: int):
         )
 
         # Tag run for traceability
-        mlflow.set_tags({
-            "data.name": "sklearn_breast_cancer",
-            "purpose": "W7D1-mlflow-adv",
-            "owner": "samarth",
-            "candidate": "true"
-        })
+        mlflow.set_tags({**RUN_TAGS, "data.fingerprint": data_fp, "data.holdout": holdout_tag(holdout)})
 
         print(f"[OK] Run {run.info.run_id} logged. AUC={auc:.4f}, F1={f1:.4f}")
 
+# ---------- Sweep mode: one data load, many runs on a process pool ----------
+
+_DATA = {}
+
+def _init_worker(data_fp, experiment_id, holdout):
+    # Workers map the cached .npy files; pages are shared, nothing is pickled over
+    X, y, _ = load_dataset(fp=data_fp)
+    ho = holdout_indices(y, data_fp, *holdout) if holdout else None
+    _DATA.update(X=X, y=y, fp=data_fp, experiment_id=experiment_id, holdout=ho)
+    mlflow.set_tracking_uri(os.environ["MLFLOW_TRACKING_URI"])
+
+def _sweep_one(task: dict) -> dict:
+    from mlflow.entities import Metric, Param, RunTag
+    t0 = time.perf_counter()
+    X, y = _DATA["X"], _DATA["y"]
+    tr, te = split_indices(y, _DATA["fp"], task["seed"], task["test_size"], holdout=task["holdout"])
+    seed, hp = task["seed"], task["hparams"]
+
+    model = build_model(seed, **hp)
+    model.fit(X[tr], y[tr])
+    metrics = evaluate(model, X[te], y[te])
+    # Per-seed test splits differ, so runs are ranked on the one holdout they all excluded
+    if _DATA["holdout"] is not None:
+        ho = _DATA["holdout"]
+        metrics.update({f"holdout_{k}": v for k, v in evaluate(model, X[ho], y[ho]).items()})
+
+    params = {
+        "random_state": seed,
+        "model_type": "logistic_regression",
+        "pipeline": "StandardScaler->LogisticRegression",
+        "max_iter": hp.get("max_iter", 1000),
+        "C": hp.get("C", 1.0),
+        "solver": "lbfgs",
+        "scikit_learn": sklearn.__version__,
+    }
+    tags = {**RUN_TAGS, "data.fingerprint": _DATA["fp"], "data.holdout": holdout_tag(task["holdout"]),
+            "sweep.id": task["sweep_id"]}
+    if task.get("baseline"):
+        tags["sweep.baseline"] = "sequential"  # timing reruns; never ranked or registered
+
+    client = mlflow.MlflowClient()
+    with mlflow.start_run(experiment_id=_DATA["experiment_id"]) as run:
+        ts = int(time.time() * 1000)
+        # One round trip for params + metrics + tags instead of three
+        client.log_batch(
+            run.info.run_id,
+            metrics=[Metric(k, v, ts, 0) for k, v in metrics.items()],
+            params=[Param(k, str(v)) for k, v in params.items()],
+            tags=[RunTag(k, str(v)) for k, v in tags.items()],
+        )
+        mlflow.log_dict(metrics, "eval/metrics.json")
+        info = mlflow.sklearn.log_model(sk_model=model, name="model",
+                                        input_example=X[te][:5], signature=None)
+
+    return {"run_id": run.info.run_id, "model_uri": info.model_uri, "seed": seed,
+            "hparams": hp, "metrics": metrics, "seconds": time.perf_counter() - t0}
+
+def parse_grid(specs) -> list:
+    """['C=0.1,1.0', 'max_iter=500'] -> [{'C': 0.1, 'max_iter': 500}, {'C': 1.0, 'max_iter': 500}]"""
+    casts = {"C": float, "max_iter": int}
+    axes = {}
+    for spec in specs or []:
+        k, vals = spec.split("=", 1)
+        k = k.strip()
+        if k not in casts:
+            raise SystemExit(f"[SWEEP] Unsupported grid key '{k}' (allowed: {sorted(casts)})")
+        axes[k] = [casts[k](v) for v in vals.split(",") if v.strip()]
+    keys = list(axes)
+    return [dict(zip(keys, combo)) for combo in itertools.product(*axes.values())] or [{}]
+
+def time_sequential(tasks: list, n: int, data_fp: str, experiment_id: str, holdout) -> dict:
+    """Wall clock of the first n sweep tasks run one after another in this process (workers=1)."""
+    n = min(n, len(tasks))
+    _init_worker(data_fp, experiment_id, holdout)
+    t0 = time.perf_counter()
+    for task in tasks[:n]:
+        _sweep_one({**task, "baseline": True})
+    seconds = time.perf_counter() - t0
+    return {"runs": n, "seconds": round(seconds, 3), "per_run_s": round(seconds / n, 3)}
+
+def sweep(seeds: list, grid: list, workers: int, top_k: int, compare_sequential: int = 0):
+    t_start = time.perf_counter()
+    cfg = load_cfg()
+    metric_key = load_policy()["primary_metric"]
+    os.environ.setdefault("MLFLOW_TRACKING_URI", os.getenv("MLFLOW_TRACKING_URI", "http://127.0.0.1:5001"))
+    mlflow.set_tracking_uri(os.environ["MLFLOW_TRACKING_URI"])
+    experiment_id = mlflow.set_experiment(cfg["experiment_name"]).experiment_id
+
+    # Load + split once up front; workers then map the same cached arrays/indices
+    X, y, data_fp = load_dataset()
+    holdout = holdout_spec(cfg)
+    for s in seeds:
+        split_indices(y, data_fp, s, cfg["test_size"], holdout=holdout)
+    t_data = time.perf_counter() - t_start
+
+    sweep_id = time.strftime("%Y%m%dT%H%M%S")
+    tasks = [{"seed": s, "hparams": hp, "test_size": cfg["test_size"], "holdout": holdout, "sweep_id": sweep_id}
+             for s in seeds for hp in grid]
+    print(f"[SWEEP] {len(tasks)} runs ({len(seeds)} seeds x {len(grid)} configs) on {workers} workers; data={data_fp}")
+
+    t_pool = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(data_fp, experiment_id, holdout)) as ex:
+        results = list(ex.map(_sweep_one, tasks))
+    t_pool = time.perf_counter() - t_pool
+
+    rank_key = f"holdout_{metric_key}" if holdout else metric_key
+    results.sort(key=lambda r: r["metrics"][rank_key], reverse=True)
+    for r in results:
+        print(f"[SWEEP] run={r['run_id']} seed={r['seed']} {r['hparams']} "
+              f"{rank_key}={r['metrics'][rank_key]:.4f} ({r['seconds']:.2f}s)")
+
+    registered = []
+    for rank, r in enumerate(results[:top_k], start=1):
+        mv = mlflow.register_model(r["model_uri"], cfg["registered_model_name"])
+        mlflow.MlflowClient().set_tag(r["run_id"], "sweep.rank", str(rank))
+        registered.append({"version": int(mv.version), "run_id": r["run_id"], "rank": rank})
+        print(f"[SWEEP] #{rank} registered as v{mv.version}")
+
+    wall = time.perf_counter() - t_start
+    # Per-run seconds are measured under pool contention, so the sequential baseline is timed
+    # separately; extrapolated from per_run_s when fewer than all runs were repeated
+    sequential = None
+    if compare_sequential > 0:
+        sequential = time_sequential(tasks, compare_sequential, data_fp, experiment_id, holdout)
+        sequential["pool_speedup"] = round(sequential["per_run_s"] * len(tasks) / t_pool, 2)
+        print(f"[SWEEP] sequential: {sequential['runs']} runs in {sequential['seconds']:.2f}s "
+              f"({sequential['per_run_s']:.2f}s/run) -> pool speedup x{sequential['pool_speedup']}")
+    summary = {
+        "sweep_id": sweep_id,
+        "data_fingerprint": data_fp,
+        "runs": len(results),
+        "workers": workers,
+        "primary_metric": metric_key,
+        "ranked_on": rank_key,
+        "data_load_s": round(t_data, 3),
+        "pool_s": round(t_pool, 3),
+        "wall_s": round(wall, 3),
+        "run_s_sum_under_contention": round(sum(r["seconds"] for r in results), 3),
+        "sequential": sequential,
+        "registered": registered,
+    }
+    os.makedirs("outputs", exist_ok=True)
+    with open("outputs/sweep_summary.json", "w") as f:
+        json.dump(summary, f, indent=2)
+    print("[SWEEP] Summary:", json.dumps(summary))
+
+# ---------- Stream mode: out-of-core partial_fit over chunks ----------
+
+def iter_chunks(source: dict, chunk_size: int):
+    """Yield (X, y, is_test) chunks; the test mask is deterministic so every pass sees the same split."""
+    if source["kind"] == "cache":
+        X, y, keep = source["X"], source["y"], source["keep"]
+        for start in range(0, len(y), chunk_size):
+            stop = min(start + chunk_size, len(y))
+            k = keep[start:stop]  # eval-holdout rows are never seen, not even for scaling
+            yield (np.asarray(X[start:stop], dtype=np.float64)[k], np.asarray(y[start:stop])[k],
+                   source["test_mask"][start:stop][k])
+    else:
+        reader = pd.read_csv(source["path"], chunksize=chunk_size)
+        for i, df in enumerate(reader):
+            y = df.pop(source["label_col"]).to_numpy()
+            rng = np.random.default_rng([source["seed"], i])
+            yield df.to_numpy(dtype=np.float64), y, rng.random(len(y)) < source["test_size"]
+
+def _timed_pass(source: dict, chunk_size: int, fn) -> list:
+    times = []
+    for X, y, is_test in iter_chunks(source, chunk_size):
+        t0 = time.perf_counter()
+        fn(X, y, is_test)
+        times.append(time.perf_counter() - t0)
+    return times
+
+def warm_start_coefs(name: str, scaler: StandardScaler):
+    """Production coefficients re-expressed in the new scaler's space, or None if not a scaled linear model."""
+    try:
+        prod = mlflow.MlflowClient().get_model_version_by_alias(name, "production")
+        model = mlflow.sklearn.load_model(f"models:/{name}/{prod.version}")
+    except Exception as e:
+        print(f"[STREAM] No production model to warm-start from ({e}); cold start.")
+        return None
+    steps = getattr(model, "steps", [])
+    old_scaler = next((s for _, s in steps if isinstance(s, StandardScaler)), None)
+    clf = steps[-1][1] if steps else model
+    if old_scaler is None or not hasattr(clf, "coef_") or clf.coef_.shape != (1, scaler.n_features_in_):
+        print(f"[STREAM] Production v{prod.version} is not a scaled binary linear model; cold start.")
+        return None
+    # logit = w·(x - m_old)/s_old + b  ->  same decision function on z = (x - m_new)/s_new
+    w = clf.coef_.ravel()
+    coef = w * scaler.scale_ / old_scaler.scale_
+    intercept = clf.intercept_[0] + np.dot(w, (scaler.mean_ - old_scaler.mean_) / old_scaler.scale_)
+    return prod.version, coef.reshape(1, -1), np.array([intercept])
+
+def stream(seed: int, input_path: str, label_col: str, chunk_size: int, epochs: int, warm_start: bool):
+    cfg = load_cfg()
+    scfg = cfg.get("stream", {}) or {}
+    chunk_size = chunk_size or int(scfg.get("chunk_size", 10000))
+    epochs = epochs or int(scfg.get("epochs", 5))
+    os.environ.setdefault("MLFLOW_TRACKING_URI", os.getenv("MLFLOW_TRACKING_URI", "http://127.0.0.1:5001"))
+    mlflow.set_tracking_uri(os.environ["MLFLOW_TRACKING_URI"])
+    mlflow.set_experiment(cfg["experiment_name"])
+    t_start = time.perf_counter()
+
+    holdout = None
+    if input_path:
+        # An external CSV is not the gate's dataset, so there is no reserved holdout to skip
+        data_fp = file_fingerprint(input_path)
+        source = {"kind": "csv", "path": input_path, "label_col": label_col,
+                  "seed": seed, "test_size": cfg["test_size"]}
+    else:
+        X, y, data_fp = load_dataset()
+        holdout = holdout_spec(cfg)
+        tr, te = split_indices(y, data_fp, seed, cfg["test_size"], holdout=holdout)
+        test_mask = np.zeros(len(y), dtype=bool)
+        test_mask[te] = True
+        keep = test_mask.copy()
+        keep[tr] = True
+        source = {"kind": "cache", "X": X, "y": y, "test_mask": test_mask, "keep": keep}
+
+    # Peak memory of the chunk passes alone; the process high-water mark (ru_maxrss) is mostly
+    # the mlflow/sklearn imports and says nothing about the out-of-core working set
+    tracemalloc.start()
+
+    # Pass 1: running mean/variance, train rows only
+    scaler = StandardScaler()
+    classes = set()
+    first = {}
+    def fit_scaler(X, y, is_test):
+        if (~is_test).any():
+            scaler.partial_fit(X[~is_test])
+            classes.update(np.unique(y[~is_test]).tolist())
+            first.setdefault("example", X[~is_test][:5])
+    scaler_times = _timed_pass(source, chunk_size, fit_scaler)
+    classes = np.array(sorted(classes))
+
+    clf = SGDClassifier(loss="log_loss", alpha=float(scfg.get("alpha", 1e-4)), learning_rate="invscaling",
+                        eta0=float(scfg.get("eta0", 0.01)), average=False, random_state=seed)
+    warm_from = None
+    if warm_start:
+        ws = warm_start_coefs(cfg["registered_model_name"], scaler)
+        if ws:
+            # partial_fit continues from preset coef_/intercept_ instead of zeros
+            warm_from, clf.coef_, clf.intercept_ = ws
+            print(f"[STREAM] Warm start from production v{warm_from}")
+
+    # Pass 2..: SGD epochs over scaled train chunks
+    def fit_clf(X, y, is_test):
+        if (~is_test).any():
+            clf.partial_fit(scaler.transform(X[~is_test]), y[~is_test], classes=classes)
+    fit_times = []
+    for _ in range(epochs):
+        fit_times += _timed_pass(source, chunk_size, fit_clf)
+
+    model = make_pipeline(scaler, clf)
+
+    # Final pass: score held-out rows chunk by chunk (only labels + probs are kept)
+    y_test, y_prob = [], []
+    def score(X, y, is_test):
+        if is_test.any():
+            y_test.append(y[is_test])
+            y_prob.append(model.predict_proba(X[is_test])[:, 1])
+    score_times = _timed_pass(source, chunk_size, score)
+    peak_alloc = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    metrics = score_metrics(np.concatenate(y_test), np.concatenate(y_prob))
+
+    chunk_ms = np.array(fit_times) * 1000.0
+    perf = {
+        "stream.chunks_per_epoch": len(scaler_times),
+        "stream.scaler_chunk_ms_mean": float(np.mean(scaler_times) * 1000.0),
+        "stream.fit_chunk_ms_mean": float(chunk_ms.mean()),
+        "stream.fit_chunk_ms_p95": float(np.percentile(chunk_ms, 95)),
+        "stream.fit_chunk_ms_max": float(chunk_ms.max()),
+        "stream.score_chunk_ms_mean": float(np.mean(score_times) * 1000.0),
+        "stream.peak_alloc_mb": peak_alloc / 2**20,
+        "stream.total_s": time.perf_counter() - t_start,
+    }
+
+    with mlflow.start_run() as run:
+        mlflow.log_params({
+            "random_state": seed,
+            "model_type": "sgd_logistic",
+            "pipeline": "StandardScaler->SGDClassifier(log_loss)",
+            "chunk_size": chunk_size,
+            "epochs": epochs,
+            "alpha": clf.alpha,
+            "eta0": clf.eta0,
+            "warm_start_from": warm_from if warm_from else "none",
+            "scikit_learn": sklearn.__version__,
+        })
+        mlflow.log_metrics({**metrics, **perf})
+        mlflow.log_dict(metrics, "eval/metrics.json")
+        mlflow.sklearn.log_model(
+            sk_model=model,
+            name="model",
+            registered_model_name=cfg["registered_model_name"],
+            input_example=first["example"],
+            signature=None
+        )
+        mlflow.set_tags({**RUN_TAGS, "data.fingerprint": data_fp, "data.holdout": holdout_tag(holdout),
+                         "train.mode": "stream"})
+
+        print(f"[STREAM] {json.dumps({k: round(v, 3) for k, v in perf.items()})}")
+        print(f"[OK] Run {run.info.run_id} logged. AUC={metrics['auc']:.4f}, F1={metrics['f1']:.4f}")
+
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--sweep", action="store_true", help="Fan out over --seeds x --grid on a process pool")
+    ap.add_argument("--seeds", type=str, default="1,2,3", help="Comma list of seeds (sweep mode)")
+    ap.add_argument("--grid", action="append", default=[], help="Repeatable: key=v1,v2 (C, max_iter)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--top-k", type=int, default=1, help="Register only the best k runs (sweep mode)")
+    ap.add_argument("--compare-sequential", type=int, default=0,
+                    help="Also time this many runs in-process one at a time and report the pool speedup")
+    ap.add_argument("--stream", action="store_true", help="Out-of-core partial_fit over chunks")
+    ap.add_argument("--input", type=str, default="", help="CSV to stream (default: cached dataset)")
+    ap.add_argument("--label-col", type=str, default="target")
+    ap.add_argument("--chunk-size", type=int, default=0, help="Rows per chunk (default: params.yaml stream.chunk_size)")
+    ap.add_argument("--epochs", type=int, default=0, help="Passes over the data (default: params.yaml stream.epochs)")
+    ap.add_argument("--warm-start", action="store_true", help="Start from the @production model's coefficients")
     args = ap.parse_args()
-    main(args.seed)
-
+    if args.stream:
+        stream(args.seed, args.input, args.label_col, args.chunk_size, args.epochs, args.warm_start)
+    elif args.sweep:
+        seeds = [int(s) for s in args.seeds.split(",") if s.strip()]
+        sweep(seeds, parse_grid(args.grid), args.workers, args.top_k, args.compare_sequential)
+    else:
+        main(args.seed)
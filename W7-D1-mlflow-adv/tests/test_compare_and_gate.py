@@ -0,0 +1,51 @@
+import os, sys
+
+import numpy as np
+import pytest
+from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from compare_and_gate import (bootstrap_weights, paired_bootstrap, weighted_accuracy, weighted_auc,
+                              weighted_f1)
+
+@pytest.fixture
+def sample():
+    rng = np.random.default_rng(7)
+    y = rng.integers(0, 2, size=300)
+    # one decimal => many tied scores across both classes
+    scores = np.clip(np.round(0.3 * y + rng.uniform(0.0, 0.7, size=300), 1), 0.0, 1.0)
+    return scores, y, bootstrap_weights(len(y), resamples=8, seed=3)
+
+def test_weighted_auc_matches_sklearn_with_ties(sample):
+    scores, y, w = sample
+    assert len(np.unique(scores)) < 15
+    expected = [roc_auc_score(y, scores, sample_weight=row) for row in w]
+    np.testing.assert_allclose(weighted_auc(scores, y, w), expected, rtol=0, atol=1e-12)
+
+def test_weighted_auc_single_class_is_nan():
+    w = np.ones((2, 4))
+    assert np.isnan(weighted_auc(np.array([0.1, 0.2, 0.3, 0.4]), np.ones(4, dtype=int), w)).all()
+
+def test_weighted_f1_and_accuracy_match_sklearn(sample):
+    scores, y, w = sample
+    pred = (scores >= 0.5).astype(np.int64)
+    np.testing.assert_allclose(weighted_f1(pred, y, w),
+                               [f1_score(y, pred, sample_weight=row) for row in w], rtol=0, atol=1e-12)
+    np.testing.assert_allclose(weighted_accuracy(pred, y, w),
+                               [accuracy_score(y, pred, sample_weight=row) for row in w], rtol=0, atol=1e-12)
+
+def test_paired_bootstrap_point_estimate_and_ci(sample):
+    scores, y, _ = sample
+    worse = np.where(np.arange(len(y)) % 5 == 0, 1.0 - scores, scores)
+    res = paired_bootstrap("auc", scores, worse, y, resamples=200, confidence=0.9, seed=0)
+    assert res["candidate"] == pytest.approx(roc_auc_score(y, scores), abs=1e-12)
+    assert res["production"] == pytest.approx(roc_auc_score(y, worse), abs=1e-12)
+    assert res["delta"] == pytest.approx(res["candidate"] - res["production"])
+    assert res["ci_low"] <= res["delta"] <= res["ci_high"]
+    assert res["ci_low"] > 0  # the candidate is strictly better on this sample
+    assert paired_bootstrap("auc", scores, worse, y, 200, 0.9, 0) == res
+
+def test_paired_bootstrap_identical_models_has_zero_width_ci(sample):
+    scores, y, _ = sample
+    res = paired_bootstrap("f1", scores, scores, y, resamples=50, confidence=0.95, seed=1)
+    assert res["delta"] == 0.0 and res["ci_low"] == 0.0 and res["ci_high"] == 0.0
@@ -0,0 +1,27 @@
+import asyncio, os, sys
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+import load_test
+
+def readyz_sequence(*responses):
+    """MockTransport that answers /readyz with the given responses in order, then 200."""
+    queue = list(responses)
+
+    def handler(request):
+        return queue.pop(0) if queue else httpx.Response(200, json={"phase": "ready"})
+    return httpx.MockTransport(handler)
+
+def wait(transport, timeout_s=5.0):
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as c:
+            return await load_test.wait_ready(c, "http://test", timeout_s)
+    return asyncio.run(run())
+
+def test_wait_ready_skips_non_json_error_pages():
+    assert wait(readyz_sequence(httpx.Response(502, text="<html>Bad Gateway</html>"),
+                                httpx.Response(503, json={"phase": "loading"})))
+
+def test_wait_ready_stops_on_failed_boot():
+    assert not wait(readyz_sequence(httpx.Response(503, json={"phase": "failed", "error": "boom"})))
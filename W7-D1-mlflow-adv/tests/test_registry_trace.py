@@ -0,0 +1,12 @@
+import os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+import registry_trace
+
+def test_commands_within_registry_budgets():
+    # Offline: each scenario runs against a throwaway SQLite store
+    budgets = registry_trace.load_yaml(os.path.join(registry_trace.ROOT, "policy.yaml"))["registry_budgets"]
+    counts = registry_trace.measure()
+    assert set(budgets) <= set(counts), f"no measurement for {sorted(set(budgets) - set(counts))}"
+    over = {c: (n, budgets[c]) for c, n in counts.items() if c in budgets and n > budgets[c]}
+    assert not over, f"registry calls over budget (calls, budget): {over}"
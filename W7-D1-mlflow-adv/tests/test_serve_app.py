@@ -0,0 +1,173 @@
+import asyncio, cProfile, json, os, sys, time
+
+import httpx
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+import serve_app
+from serve_bench import StubModel
+
+N_FEATURES = 2
+
+@pytest.fixture
+def stub_app(tmp_path, monkeypatch):
+    monkeypatch.setattr(serve_app, "model", StubModel(n_features=N_FEATURES))
+    monkeypatch.setattr(serve_app, "n_features", N_FEATURES)
+    monkeypatch.setattr(serve_app, "LOG_PATH", str(tmp_path / "requests.jsonl"))
+    yield serve_app.app
+    serve_app.use_fast_json(False)
+
+def post_all(app, bodies, fast):
+    serve_app.use_fast_json(fast)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+            return [await c.post("/predict", content=b, headers={"content-type": "application/json"})
+                    for b in bodies]
+    return [(r.status_code, r.json()) for r in asyncio.run(run())]
+
+class SlowStub(StubModel):
+    def predict_proba(self, X):
+        time.sleep(0.05)  # keep requests overlapping
+        return super().predict_proba(X)
+
+class ProcessWideProfile(cProfile.Profile):
+    """cProfile as on Python 3.12+: a second enable() anywhere in the process raises."""
+    enabled = 0
+
+    def enable(self, *args, **kwargs):
+        if ProcessWideProfile.enabled:
+            raise ValueError("Another profiling tool is already active")
+        ProcessWideProfile.enabled += 1
+        super().enable(*args, **kwargs)
+
+    def disable(self):
+        super().disable()
+        ProcessWideProfile.enabled -= 1
+
+def test_concurrent_requests_during_deterministic_profile(stub_app, monkeypatch):
+    monkeypatch.setattr(serve_app, "model", SlowStub(n_features=N_FEATURES))
+    monkeypatch.setattr(serve_app, "ADMIN_TOKEN", "t")
+    monkeypatch.setattr(cProfile, "Profile", ProcessWideProfile)
+    admin = {"x-admin-token": "t"}
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=stub_app), base_url="http://test") as c:
+            r = await c.post("/admin/profile", params={"mode": "deterministic", "seconds": 30}, headers=admin)
+            assert r.status_code == 200
+            rs = await asyncio.gather(*[c.post("/predict", json={"rows": [[1.0, 2.0]]}) for _ in range(6)])
+            serve_app._prof_finish()
+            return rs, await c.get("/admin/profile", headers=admin)
+    responses, profile = asyncio.run(run())
+    assert [r.status_code for r in responses] == [200] * 6
+    assert profile.status_code == 200
+    profiled, skipped = serve_app._prof["profiled"], serve_app._prof["skipped"]
+    assert profiled >= 1 and profiled + skipped == 6
+    assert "_predict" in profile.text
+
+BODIES = {
+    "ok": b'{"rows": [[1.0, 2.0], [3, 4]]}',
+    "null": b'{"rows": [[1.0, null]]}',
+    "string": b'{"rows": [[1.0, "a"]]}',
+    "numeric_string": b'{"rows": [[1.0, "2.5"]]}',
+    "ragged": b'{"rows": [[1.0, 2.0], [3.0]]}',
+    "flat": b'{"rows": [1.0, 2.0]}',
+    "empty": b'{"rows": []}',
+    "nan": b'{"rows": [[NaN, 1.0]]}',
+    "overflow": b'{"rows": [[1e400, 1.0]]}',
+    "not_json": b"not json",
+    "no_body": b"",
+    "no_rows": b'{"x": 1}',
+    "not_object": b"[1]",
+    "wrong_features": b'{"rows": [[1.0, 2.0, 3.0]]}',
+}
+
+@pytest.mark.parametrize("name", sorted(BODIES))
+def test_fast_json_matches_pydantic_path(stub_app, name):
+    pytest.importorskip("orjson")
+    slow = post_all(stub_app, [BODIES[name]], fast=False)
+    fast = post_all(stub_app, [BODIES[name]], fast=True)
+    assert fast == slow
+
+def test_fast_json_error_codes(stub_app):
+    pytest.importorskip("orjson")
+    names = ["null", "string", "ragged", "nan"]
+    (null, string, ragged, nan) = post_all(stub_app, [BODIES[n] for n in names], fast=True)
+    assert null[0] == 422 and null[1]["detail"][0]["type"] == "float_type"
+    assert null[1]["detail"][0]["loc"] == ["body", "rows", 0, 1]
+    assert string[0] == 422 and string[1]["detail"][0]["type"] == "float_parsing"
+    assert ragged == (400, {"detail": "rows must be 2D list"})
+    assert nan[0] == 422 and nan[1]["detail"][0]["type"] == "finite_number"
+
+@pytest.mark.parametrize("with_mean,with_std", [(True, True), (False, True), (True, False), (False, False)])
+def test_linear_contributions_sum_to_decision_function(with_mean, with_std):
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(loc=5.0, scale=3.0, size=(200, 4))
+    y = (X[:, 0] - X[:, 1] + rng.normal(size=200) > 0).astype(int)
+    m = make_pipeline(StandardScaler(with_mean=with_mean, with_std=with_std), LogisticRegression()).fit(X, y)
+
+    form = serve_app._linear_form(m)
+    log_odds, contrib, base = serve_app._explain_linear(form, X[:20])
+    np.testing.assert_allclose(contrib.sum(axis=1), m.decision_function(X[:20]) - base, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(log_odds, m.decision_function(X[:20]), rtol=1e-9, atol=1e-9)
+    # the occlusion baseline is the raw point the scaler maps to zero
+    np.testing.assert_allclose(m.decision_function(serve_app._background(m)[None, :]), [base], atol=1e-9)
+
+def explain(app, body):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+            return await c.post("/explain", json=body)
+    return asyncio.run(run())
+
+def test_explain_rejects_non_finite_rows(stub_app):
+    r = explain(stub_app, {"rows": [[float("nan"), 1.0]]})
+    assert r.status_code == 422 and r.json()["detail"][0]["type"] == "finite_number"
+
+def test_explain_occlusion_background_width_mismatch(stub_app, tmp_path, monkeypatch):
+    ref = {"features": [{"edges": [0.0, 1.0], "ref_p": [1.0]}] * (N_FEATURES + 1)}
+    (tmp_path / "reference_bins.json").write_text(json.dumps(ref))
+    monkeypatch.setattr(serve_app, "REFERENCE_PATH", str(tmp_path / "reference_bins.json"))
+    r = explain(stub_app, {"rows": [[1.0, 2.0]]})
+    assert r.status_code == 501
+
+def test_sampled_explanations_stay_out_of_drift_sample(stub_app, tmp_path, monkeypatch):
+    import drift_check
+    ref = {"features": [{"edges": [0.0, 1.0], "ref_p": [1.0]}] * N_FEATURES}
+    (tmp_path / "reference_bins.json").write_text(json.dumps(ref))
+    monkeypatch.setattr(serve_app, "REFERENCE_PATH", str(tmp_path / "reference_bins.json"))
+    monkeypatch.setattr(serve_app, "EXPLAIN_LOG_RATE", 1.0)
+    assert explain(stub_app, {"rows": [[1.0, 2.0]]}).status_code == 200
+    monkeypatch.setattr(drift_check, "REQS", serve_app.LOG_PATH)
+    assert "explain_rows" in open(serve_app.LOG_PATH).read()
+    assert drift_check.read_recent_rows().size == 0
+
+@pytest.mark.parametrize("budget,code", [("abc", 400), ("nan", 400), ("inf", 400), ("-5", 400), ("5000", 200)])
+def test_request_timeout_header_validation(stub_app, budget, code):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=stub_app), base_url="http://test") as c:
+            return await c.post("/predict", json={"rows": [[1.0, 2.0]]},
+                                headers={serve_app.DEADLINE_HEADER: budget})
+    r = asyncio.run(run())
+    assert r.status_code == code
+
+def test_standby_is_warmed_before_it_is_published(monkeypatch):
+    calls = []
+
+    class ColdStub(StubModel):
+        def predict_proba(self, X):
+            assert serve_app.standby is None, "standby published before warm-up"
+            calls.append(len(X))
+            return super().predict_proba(X)
+
+    monkeypatch.setattr(serve_app, "standby", None)
+    monkeypatch.setattr(serve_app, "n_features", N_FEATURES)
+    monkeypatch.setattr(serve_app, "_resolve_standby", lambda spec: "3")
+    monkeypatch.setattr(serve_app.mlflow.sklearn, "load_model", lambda uri: ColdStub(n_features=N_FEATURES))
+    serve_app._load_standby("3")
+    assert serve_app.standby is not None and serve_app.standby["version"] == "3"
+    assert calls == [b for b in serve_app.WARMUP_BATCHES for _ in range(serve_app.WARMUP_ROUNDS)]